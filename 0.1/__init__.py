@@ -17,11 +17,6 @@ def printContext(context, header = 'Context:'):
     for ((name, sub), (type, expr)) in context.items():
         print('    ' + name + '[' + str(sub) + '] : ' + str(type) + ' = ' + str(expr))
 
-def printUsedVars():
-    print('UsedVars:')
-    for (name,  val) in usedVars.items():
-        print('    ' + name + ' = ' + str(val))
-
 if len(sys.argv) == 2:
     for s in open(sys.argv[1]):
         r = parse(s)
@@ -37,5 +32,4 @@ while True:
         print(e)
         printContext(e.context)
         printContext(globalContext, 'Global context:')
-        printUsedVars()
 
@@ -1,28 +1,88 @@
 import ttErrors
 
-usedVars = {'': 0}
+import itertools
+
+freshSubs = itertools.count(1) # the supply of subscripts of unique variables, 0 being reserved for names in the source
 globalContext = {}
 
 class Variable(object):
     def __init__(self, name = '', sub = None):
 # None means that we introduce a unique variable; otherwise we refer to an existing one
-        global usedVars
         if sub == None:
-            try:
-                sub = usedVars[name]
-            except KeyError:
-                sub = 0
-                usedVars[name] = 0
+            sub = next(freshSubs)
         self.name = name
         self.sub = sub
         self.namesub = (self.name, self.sub)
-        try:
-            usedVars[name] = max(usedVars[name], sub + 1)
-        except KeyError:
-            usedVars[name] = sub + 1
     def __repr__(self):
         return 'Variable(' + repr(self.name) + ', ' + repr(self.sub) + ')'
 
+# Persistent maps, as hash tries. A node is None, a leaf, which is a tuple of the (key, value) pairs of one hash,
+# or a branch, which is a list of 32 nodes indexed by the next 5 bits of the hash. Adding a pair copies the branches
+# on the path of its key only, so that a map is extended in O(log n) steps without being changed, and lookups take
+# as many steps.
+
+hashMask = (1 << 64) - 1
+
+def trieGet(node, key, default = None):
+    h = hash(key) & hashMask
+    while isinstance(node, list):
+        node = node[h & 31]
+        h = h >> 5
+    if node is not None:
+        for (k, v) in node:
+            if k == key:
+                return v
+    return default
+
+def trieSet(node, key, value, h = None, shift = 0):
+    if h is None:
+        h = hash(key) & hashMask
+    if node is None:
+        return ((key, value),)
+    if isinstance(node, tuple):
+        h2 = hash(node[0][0]) & hashMask
+        if h2 == h:
+            return tuple(p for p in node if p[0] != key) + ((key, value),)
+        branch = [None] * 32
+        branch[(h2 >> shift) & 31] = node
+        node = branch
+    else:
+        node = list(node)
+    i = (h >> shift) & 31
+    node[i] = trieSet(node[i], key, value, h, shift + 5)
+    return node
+
+def trieItems(node):
+    if isinstance(node, list):
+        for n in node:
+            for item in trieItems(n):
+                yield item
+    elif node is not None:
+        for item in node:
+            yield item
+
+class Context(object):
+    '''A persistent context: the bindings of variables to (type, value) pairs on top of a dict, usually globalContext.
+    Extending a context doesn't copy or modify it, and inner bindings shadow outer ones. The bindings are kept in a hash
+    trie, so that extending a context and looking a variable up take O(log n) steps, however deep the binders.'''
+    def __init__(self, parent, namesub, type, value = None):
+        if isinstance(parent, Context):
+            (self.base, trie) = (parent.base, parent.trie)
+        else:
+            (self.base, trie) = (parent, None)
+        self.trie = trieSet(trie, namesub, (type, value))
+    def __getitem__(self, namesub):
+        binding = trieGet(self.trie, namesub)
+        if binding is None:
+            return self.base[namesub]
+        return binding
+    def items(self):
+        for item in trieItems(self.trie):
+            yield item
+        for item in self.base.items():
+            if trieGet(self.trie, item[0]) is None:
+                yield item
+
 class Abstraction(object):
     def __init__(self, var, type, expr):
         self.var = var
@@ -32,29 +92,49 @@ class Abstraction(object):
         return 'Abstraction(' + repr(self.var) + ', ' + repr(self.type) + ', ' + repr(self.expr) + ')'
     def subst(self, dict):
         return Abstraction(self.var, self.type.subst(dict), self.expr.subst(dict))
-    def identical(self, abs):
-        if self.type.identical(abs.type):
-            v = Variable()
-            t1 = self.expr.subst({self.var.namesub: TVariable(v)})
-            t2 = abs.expr.subst({abs.var.namesub: TVariable(v)})
-            return t1.identical(t2)
-        else:
-            return False
+    def identical(self, abs, bound = None):
+        # The bound variables of both sides are numbered by their binder level instead of being substituted for a common fresh one
+        (left, right, level) = bound if bound != None else (None, None, 0)
+        return self.type.identical(abs.type, bound) and self.expr.identical(abs.expr,
+            (trieSet(left, self.var.namesub, level), trieSet(right, abs.var.namesub, level), level + 1))
+    def show(self, arrow, names):
+        '''The printed form of a binder. Bound variables are numbered by name within the term being printed, from 1,
+        whatever their unique subscripts: names maps the variables bound so far to their printed forms, and each name
+        to the number of its enclosing binders.'''
+        type = self.type.show(names)
+        n = names.get(self.var.name, 0)
+        shown = self.var.name + '[' + str(n + 1) + ']'
+        outer = names.get(self.var.namesub)
+        (names[self.var.name], names[self.var.namesub]) = (n + 1, shown)
+        try:
+            return '((' + shown + ' : ' + type + ') ' + arrow + ' ' + self.expr.show(names) + ')'
+        finally:
+            names[self.var.name] = n
+            if outer == None:
+                del names[self.var.namesub]
+            else:
+                names[self.var.namesub] = outer
     def normalize(self, context):
+        # The variable is renamed by binding it to the new one, which is itself bound without a value
         newvar = Variable(self.var.name)
-        newtype = self.type.subst({self.var.namesub: TVariable(newvar)}).normalize(context)
-        newcontext = context.copy()
-        newcontext[newvar.namesub] = (newtype, None)
-        return Abstraction(newvar, newtype, self.expr.subst({self.var.namesub: TVariable(newvar)}).normalize(newcontext))
+        newtype = self.type.normalize(context)
+        newcontext = Context(Context(context, newvar.namesub, newtype), self.var.namesub, newtype, TVariable(newvar))
+        return Abstraction(newvar, newtype, self.expr.normalize(newcontext))
 
 class Term(object):
     def __init__(self):
         raise ttErrors.AbstractError()
     def __repr__(self):
         return 'Term()'
+    def __str__(self):
+        return self.show({})
+    def show(self, names):
+        raise ttErrors.AbstractError()
     def subst(self, dict):
         raise ttErrors.AbstractError()
-    def identical(self, term):
+    def identical(self, term, bound = None):
+        '''Alpha-equivalence. bound is a triple of the binder levels of the variables bound so far on each side, as tries,
+        and the current level.'''
         raise ttErrors.AbstractError()
     def inferType(self, context):
         raise ttErrors.AbstractError()
@@ -80,7 +160,10 @@ class TVariable(Term):
         self.var = var # Variable
     def __repr__(self):
         return 'TVariable(' + repr(self.var) + ')'
-    def __str__(self):
+    def show(self, names):
+        shown = names.get(self.var.namesub)
+        if shown != None:
+            return shown
         if self.var.sub == 0:
             return self.var.name
         else:
@@ -90,8 +173,15 @@ class TVariable(Term):
             return dict[self.var.namesub]
         except KeyError:
             return self
-    def identical(self, term):
-        return (self == term) or (isinstance(term, TVariable) and (self.var.namesub == term.var.namesub))
+    def identical(self, term, bound = None):
+        if not isinstance(term, TVariable):
+            return False
+        if bound != None:
+            level1 = trieGet(bound[0], self.var.namesub)
+            level2 = trieGet(bound[1], term.var.namesub)
+            if (level1 != None) or (level2 != None):
+                return level1 == level2
+        return self.var.namesub == term.var.namesub
     def inferType(self, context):
         try:
             return context[self.var.namesub][0]
@@ -99,9 +189,13 @@ class TVariable(Term):
             raise ttErrors.UnknownVariableError(self.var, context)
     def normalize(self, context):
         try:
-            return context[self.var.namesub][1].normalize(context)
-        except (KeyError, AttributeError):
+            value = context[self.var.namesub][1]
+        except KeyError:
             return self
+        if value == None:
+            return self
+        try:
+            return value.normalize(context)
         except RuntimeError:
             raise ttErrors.RecursionError(self,  context)
 
@@ -110,11 +204,11 @@ class TUniverse(Term):
         self.n = n # int
     def __repr__(self):
         return 'TUniverse(' + repr(self.n) + ')'
-    def __str__(self):
+    def show(self, names):
         return 'type[' + str(self.n) + ']'
     def subst(self, dict):
         return self
-    def identical(self, term):
+    def identical(self, term, bound = None):
         return (self == term) or (isinstance(term, TUniverse) and (self.n == term.n))
     def inferType(self, context):
         return TUniverse(self.n + 1)
@@ -126,17 +220,15 @@ class TProduct(Term):
         self.abs = abs # Abstraction
     def __repr__(self):
         return 'TProduct(' + repr(self.abs) + ')'
-    def __str__(self):
-        return '((' + str(TVariable(self.abs.var)) + ' : ' + str(self.abs.type) + ') -> ' + str(self.abs.expr) + ')'
+    def show(self, names):
+        return self.abs.show('->', names)
     def subst(self, dict):
         return TProduct(self.abs.subst(dict))
-    def identical(self, term):
-        return (self == term) or (isinstance(term, TProduct) and self.abs.identical(term.abs))
+    def identical(self, term, bound = None):
+        return ((self == term) and (bound == None)) or (isinstance(term, TProduct) and self.abs.identical(term.abs, bound))
     def inferType(self, context):
         n1 = self.abs.type.inferUniverse(context)
-        newcontext = context.copy()
-        newcontext[self.abs.var.namesub] = (self.abs.type, None)
-        n2 = self.abs.expr.inferUniverse(newcontext)
+        n2 = self.abs.expr.inferUniverse(Context(context, self.abs.var.namesub, self.abs.type))
         return TUniverse(max(n1, n2))
     def normalize(self, context):
         return TProduct(self.abs.normalize(context))
@@ -146,17 +238,15 @@ class TLambda(Term):
         self.abs = abs # Abstraction
     def __repr__(self):
         return 'TLambda(' + repr(self.abs) + ')'
-    def __str__(self):
-        return '((' + str(TVariable(self.abs.var)) + ' : ' + str(self.abs.type) + ') => ' + str(self.abs.expr) + ')'
+    def show(self, names):
+        return self.abs.show('=>', names)
     def subst(self, dict):
         return TLambda(self.abs.subst(dict))
-    def identical(self, term):
-        return (self == term) or (isinstance(term, TLambda) and self.abs.identical(term.abs))
+    def identical(self, term, bound = None):
+        return ((self == term) and (bound == None)) or (isinstance(term, TLambda) and self.abs.identical(term.abs, bound))
     def inferType(self, context):
         self.abs.type.inferUniverse(context)
-        newcontext = context.copy()
-        newcontext[self.abs.var.namesub] = (self.abs.type, None)
-        return TProduct(Abstraction(self.abs.var, self.abs.type, self.abs.expr.inferType(newcontext)))
+        return TProduct(Abstraction(self.abs.var, self.abs.type, self.abs.expr.inferType(Context(context, self.abs.var.namesub, self.abs.type))))
     def normalize(self, context):
         return TLambda(self.abs.normalize(context))
 
@@ -166,12 +256,12 @@ class TApplication(Term):
         self.term2 = term2
     def __repr__(self):
         return 'TApplication(' + repr(self.term1) + ', ' + repr(self.term2) + ')'
-    def __str__(self):
-        return '(' + str(self.term1) + ' ' + str(self.term2) + ')'
+    def show(self, names):
+        return '(' + self.term1.show(names) + ' ' + self.term2.show(names) + ')'
     def subst(self, dict):
         return TApplication(self.term1.subst(dict), self.term2.subst(dict))
-    def identical(self, term):
-        return (self == term) or (isinstance(term, TApplication) and self.term1.identical(term.term1) and self.term2.identical(term.term2))
+    def identical(self, term, bound = None):
+        return ((self == term) and (bound == None)) or (isinstance(term, TApplication) and self.term1.identical(term.term1, bound) and self.term2.identical(term.term2, bound))
     def inferType(self, context):
         p = self.term1.inferProduct(context)
         if p.type.equal(self.term2.inferType(context), context):
@@ -179,16 +269,10 @@ class TApplication(Term):
         else:
             raise ttErrors.TypeMismatchError(self, context)
     def normalize(self, context):
-        p = self.term1.inferProduct(context)
-        if p.type.equal(self.term2.inferType(context), context):
-            t1 = self.term1.normalize(context)
-            t2 = self.term2.normalize(context)
-            if isinstance(t1, TLambda):
-                newcontext = context.copy()
-                newcontext[t1.abs.var.namesub] = (t2.inferType(context), t2)
-                return t1.abs.expr.normalize(newcontext)
-            else:
-                return TApplication(t1, t2)
+        # Terms are checked once by inferType before they are normalized, so types aren't inferred again here
+        t1 = self.term1.normalize(context)
+        t2 = self.term2.normalize(context)
+        if isinstance(t1, TLambda):
+            return t1.abs.expr.normalize(Context(context, t1.abs.var.namesub, t1.abs.type, t2))
         else:
-            raise ttErrors.TypeMismatchError(self, context)
-
+            return TApplication(t1, t2)
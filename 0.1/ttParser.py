@@ -40,11 +40,11 @@ class STypedDefinition(Statement):
     def execute(self):
         global globalContext
         v = TVariable(Variable(self.name, 0))
-        if self.expr.inferType(globalContext).equal(self.type):
+        if self.expr.inferType(globalContext).equal(self.type, globalContext):
             globalContext[(self.name, 0)] = (self.type, self.expr)
             return v
         else:
-            raise TypeMismatchError()
+            raise ttErrors.TypeMismatchError(self.expr, globalContext)
 
 class SCheck(Statement):
     def __init__(self, expr):
@@ -56,6 +56,7 @@ class SEvaluate(Statement):
     def __init__(self, expr):
         self.expr = expr
     def execute(self):
+        self.expr.inferType(globalContext)
         return self.expr.normalize(globalContext)
 
 class SExpression(Statement):
@@ -187,15 +188,36 @@ def p_expression_anonproduct(t):
     'expression : expression arrow expression %prec arrow'
     t[0] = TProduct(Abstraction(Variable(), t[1], t[3]))
 
+# A binder introduces its unique variable as soon as its arrow is read, before its body is parsed, and the names
+# in the body refer to the innermost binder of the name, so that binders aren't renamed by substitution afterwards
+
+scopes = {} # name -> the Variables of the binders of the name being parsed, innermost last
+
+def bind(binder):
+    var = Variable(binder[0])
+    scopes.setdefault(binder[0], []).append(var)
+    return (var, binder[1])
+
+def unbind(var):
+    scopes[var.name].pop()
+
+def p_product_head(t):
+    'product_head : binder arrow'
+    t[0] = bind(t[1])
+
+def p_function_head(t):
+    'function_head : binder darrow'
+    t[0] = bind(t[1])
+
 def p_expression_product(t):
-    'expression : binder arrow expression %prec arrow'
-    newvar = TVariable(Variable(t[1][0]))
-    t[0] = TProduct(Abstraction(newvar.var, t[1][1], t[3].subst({(t[1][0], 0): newvar})))
+    'expression : product_head expression %prec arrow'
+    unbind(t[1][0])
+    t[0] = TProduct(Abstraction(t[1][0], t[1][1], t[2]))
 
 def p_expression_function(t):
-    'expression : binder darrow expression %prec darrow'
-    newvar = TVariable(Variable(t[1][0]))
-    t[0] = TLambda(Abstraction(newvar.var, t[1][1], t[3].subst({(t[1][0], 0): newvar})))
+    'expression : function_head expression %prec darrow'
+    unbind(t[1][0])
+    t[0] = TLambda(Abstraction(t[1][0], t[1][1], t[2]))
 
 # For some reason precedence doesn't work here. So we emulate it.
 
@@ -221,7 +243,8 @@ def p_simple_expression_qname(t):
 
 def p_simple_expression_name(t):
     'simple_expression : name'
-    t[0] = TVariable(Variable(t[1], 0))
+    vars = scopes.get(t[1])
+    t[0] = TVariable(vars[-1] if vars else Variable(t[1], 0))
 
 def p_simple_expression_paren(t):
     'simple_expression : lparen expression rparen'
@@ -239,5 +262,7 @@ def debugLex(s):
         print(repr(tok.type), repr(tok.value))
 
 def parse(s):
+    # A failed parse may leave binders open
+    scopes.clear()
     return yacc.parse(s)
 
@@ -5,29 +5,52 @@ import ttParser
 from ttParser import *
 
 import ttErrors
+import ttJobs
+import ttStream
+import ttTrace
 
+import atexit
 import readline
 
 import sys
 
 sys.setrecursionlimit(1000000)
 
+def show(r):
+    # Streams are printed as they are computed, so that the head of a large normal form shows up first
+    if isinstance(r, ttStream.Stream):
+        r.write(sys.stdout)
+    else:
+        print(r)
+
 def printContext(context, header = 'Context:'):
     print(header)
     for (name, var) in context.items():
         print('    ' + name + ' : ' + str(var.type) + ' = ' + str(var.value))
 
-if len(sys.argv) == 2:
-    for s in open(sys.argv[1]):
+# Usage: python __init__.py [--trace file.json] [script]
+args = sys.argv[1:]
+if args[: 1] == ['--trace']:
+    ttTrace.startTracing(args[1])
+    atexit.register(ttTrace.stopTracing)
+    args = args[2:]
+
+if len(args) == 1:
+    for s in open(args[0]):
         r = parse(s)
         if r != None:
-            print(r.execute())
+            show(r.execute())
 
 while True:
+    for outcome in ttJobs.jobs().finished():
+        print(outcome)
     s = input('> ')
     try:
         r = parse(s)
-        print(r.execute())
+        show(r.execute())
     except (ttErrors.ParsingError, ttErrors.TypeTheoreticError) as e:
         print(e)
-        printContext(globalContext, 'Global context:')
+        printContext(session().context, 'Global context:')
+    except KeyboardInterrupt:
+        # Statements restore the mode and register nothing until they are done, so the session is as it was
+        print('Interrupted')
@@ -0,0 +1,75 @@
+# Loading statements through ttIngest versus the PLY parser, on the same generated corpus
+# Run with: python benchmarks/ingest.py [number of definitions]
+# Each load runs in a fresh Session. Loading is timed apart from executing, which for ttIngest also checks the
+# declarations, as the lines of a file are not trusted.
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.setrecursionlimit(1000000)
+
+import ttCore
+import ttIngest
+import ttParser
+
+def corpus(n):
+    '''Surface statements: Church numerals of growing size, and sums of earlier ones.'''
+    yield 'parameter N : type[0]'
+    yield 'parameter O : N'
+    yield 'parameter S : N -> N'
+    yield 'definition numeral := (T : type[0]) -> (T -> T) -> T -> T'
+    yield 'definition plus := (n1 : numeral) => (n2 : numeral) => (T : type[0]) => (f : T -> T) => (x : T) => n1 T f (n2 T f x)'
+    for i in range(n):
+        k = i % 50 + 1
+        yield 'definition c' + str(i) + ' := (T : type[0]) => (f : T -> T) => (x : T) => ' + 'f (' * k + 'x' + ')' * k
+        if i > 0:
+            yield 'definition s' + str(i) + ' : numeral := plus c' + str(i) + ' (plus c' + str(i // 2) + ' s' + str(i - 1) + ')'
+        else:
+            yield 'definition s0 : numeral := c0'
+    yield 'check s' + str(n - 1) + ' N S O'
+
+def load(read, path):
+    '''Read and execute the statements of path in a fresh Session, and return the times spent on each.'''
+    def run():
+        (loading, executing) = (0.0, 0.0)
+        with open(path) as f:
+            statements = read(f)
+            while True:
+                t0 = time.perf_counter()
+                s = next(statements, None)
+                t1 = time.perf_counter()
+                if s == None:
+                    return (loading + t1 - t0, executing)
+                s.execute()
+                (loading, executing) = (loading + t1 - t0, executing + time.perf_counter() - t1)
+    return ttCore.runIn(ttCore.Session(), run)
+
+def parsed(f):
+    for line in f:
+        s = ttParser.parse(line)
+        if s != None:
+            yield s
+
+def main(n):
+    directory = tempfile.mkdtemp()
+    text = os.path.join(directory, 'corpus.txt')
+    ndjson = os.path.join(directory, 'corpus.ndjson')
+    with open(text, 'w') as f:
+        for line in corpus(n):
+            f.write(line + '\n')
+    # The machine-readable corpus is exported from the parsed one, so that both hold the same terms
+    def export():
+        with open(ndjson, 'w') as out:
+            for s in parsed(open(text)):
+                out.write(ttIngest.export(s) + '\n')
+                s.execute()
+    ttCore.runIn(ttCore.Session(), export)
+    print(str(n) + ' definitions: ' + str(os.path.getsize(text)) + ' bytes of text, ' + str(os.path.getsize(ndjson)) + ' bytes of NDJSON')
+    for (name, read, path) in [('PLY', parsed, text), ('ttIngest', ttIngest.statements, ndjson)]:
+        (loading, executing) = load(read, path)
+        print(name + ': loading ' + str(round(loading, 2)) + ' sec, executing ' + str(round(executing, 2)) + ' sec')
+
+main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
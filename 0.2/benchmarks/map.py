@@ -0,0 +1,59 @@
+# Evaluating one function over many inputs: a statement per input versus map and parallel map
+# Run with: python benchmarks/map.py [number of inputs]
+# The function iterates the composition of 256 identities over its argument, a Church numeral. evaluate applies
+# the 256 identities at each iteration of each input, while map normalizes the function once, which reduces
+# their composition to the identity, and compiles its normal form.
+# Each way runs in a fresh Session and is timed including parsing, and the results of map, which are streamed,
+# are computed in full.
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.setrecursionlimit(1000000)
+
+import ttCore
+import ttParser
+import ttStream
+
+definitions = [
+    'parameter N : type[0]',
+    'parameter O : N',
+    'definition id := (x : N) => x',
+    'definition numeral := (T : type[0]) -> (T -> T) -> T -> T',
+    'definition one := (T : type[0]) => (f : T -> T) => (x : T) => f x',
+    'definition plus := (n1 : numeral) => (n2 : numeral) => (T : type[0]) => (f : T -> T) => (x : T) => n1 T f (n2 T f x)',
+    'definition power := (n1 : numeral) => (n2 : numeral) => (T : type[0]) => n2 (T -> T) (n1 T)',
+    'definition two := plus one one',
+    'definition eight := plus (plus two two) (plus two two)',
+    'definition test := (n : numeral) => n N (power two eight N id) O'
+]
+
+def numeral(k):
+    return '(T : type[0]) => (f : T -> T) => (x : T) => ' + 'f (' * k + 'x' + ')' * k
+
+def run(lines):
+    '''Execute lines in a fresh Session and return the time it took.'''
+    def execute():
+        t0 = time.perf_counter()
+        for line in lines:
+            s = ttParser.parse(line)
+            if s != None:
+                ttStream.force(s.execute())
+        return time.perf_counter() - t0
+    return ttCore.runIn(ttCore.Session(), execute)
+
+def main(n):
+    inputs = os.path.join(tempfile.mkdtemp(), 'inputs.txt')
+    with open(inputs, 'w') as f:
+        for i in range(n):
+            f.write(numeral(i % 50 + 1) + '\n')
+    for (name, lines) in [
+            ('evaluate', ['evaluate test (' + numeral(i % 50 + 1) + ')' for i in range(n)]),
+            ('map', ['map test over "' + inputs + '"']),
+            ('parallel map', ['parallel map test over "' + inputs + '"'])]:
+        print(name + ': ' + str(round(run(definitions + lines), 2)) + ' sec')
+
+main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
@@ -0,0 +1,69 @@
+# The MemoStore under memory pressure: collection of dropped terms and eviction of live ones
+# Run with: python benchmarks/memo.py [maxEntries]
+# Normal forms of fresh applications are memoized, many more than the store keeps. Terms which are dropped release
+# their entries with them and are counted as collected when the store sweeps; entries of terms which are kept are
+# evicted, unless they were used since they were last considered. The counters are checked along the way.
+
+import gc
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import ttCore
+from ttCore import *
+
+def fresh(n, keep = True):
+    '''n new applications of a parameter, each with an entry in the store once normalized, dropped unless kept.'''
+    S = TGlobalVariable(Variable('S'))
+    O = TGlobalVariable(Variable('O'))
+    terms = []
+    for _ in range(n):
+        t = TApplication(S, O)
+        t.normalize()
+        if keep:
+            terms.append(t)
+    return terms
+
+def main(maxEntries):
+    Variable('N', type = TUniverse(0), new = True)
+    Variable('O', type = TGlobalVariable(Variable('N')), new = True)
+    Variable('S', type = TProduct('', TGlobalVariable(Variable('N')), TGlobalVariable(Variable('N'))), new = True)
+    memo.setBudget(maxEntries)
+    t0 = time.perf_counter()
+
+    # Dropped terms: their entries go with them, and the store forgets them when it sweeps
+    for _ in range(10):
+        fresh(maxEntries, keep = False)
+    gc.collect()
+    s = memo.statistics()
+    print('dropped: ' + str(s))
+    assert s['entries'] <= maxEntries
+    assert s['collected'] >= 9 * maxEntries
+    assert s['evictions'] == 0
+
+    # Kept terms: entries are evicted, the newest one never, and those used meanwhile get a second chance
+    kept = fresh(maxEntries // 2)
+    used = kept[0]
+    kept = kept + fresh(maxEntries // 2)
+    used.normalize()
+    last = fresh(1)[0]
+    kept = kept + fresh(maxEntries // 2)
+    s = memo.statistics()
+    print('kept: ' + str(s))
+    assert s['entries'] <= maxEntries
+    assert s['evictions'] > 0
+    assert last._memo is not None
+    assert used._memo is not None
+    assert kept[1]._memo is None
+
+    # The newest entry is kept, even by the smallest store
+    memo.setBudget(1)
+    for _ in range(10):
+        t = TGlobalVariable(Variable('O'))
+        t.normalize()
+        assert (t._memo is not None) and (len(memo) == 1)
+    print(str(round(time.perf_counter() - t0, 2)) + ' sec')
+
+ttCore.runIn(ttCore.Session(), lambda: main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000))
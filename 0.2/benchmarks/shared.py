@@ -0,0 +1,71 @@
+# Worker processes loading a whole library versus attaching to one published library
+# Run with: python benchmarks/shared.py [number of definitions] [number of workers]
+# The workers are spawned, so that they inherit nothing, and each checks one term which uses a few definitions.
+# Loading ingests the NDJSON export of the library in every worker; attaching maps the published library and
+# decodes only what the term refers to. The resident memory of each worker afterwards, as Linux reports it, and its
+# time are reported.
+
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.setrecursionlimit(1000000)
+
+import ttCore
+import ttIngest
+import ttParser
+import ttShared
+
+def corpus(n):
+    '''Surface statements: Church numerals of growing size, and products of neighbouring ones.'''
+    yield 'parameter N : type[0]'
+    yield 'parameter O : N'
+    yield 'parameter S : N -> N'
+    yield 'definition numeral := (T : type[0]) -> (T -> T) -> T -> T'
+    yield 'definition times := (a : numeral) => (b : numeral) => (T : type[0]) => (f : T -> T) => a T (b T f)'
+    for i in range(n):
+        k = i % 50 + 1
+        yield 'definition c' + str(i) + ' : numeral := (T : type[0]) => (f : T -> T) => (x : T) => ' + 'f (' * k + 'x' + ')' * k
+        yield 'definition p' + str(i) + ' : numeral := times c' + str(i) + ' c' + str(i // 2)
+
+def work(how, path, n):
+    def run():
+        t0 = time.perf_counter()
+        if how == 'load':
+            ttIngest.ingest(path)
+        else:
+            ttShared.attach(path)
+        ttParser.parse('check p' + str(n - 1) + ' N S O').execute()
+        return time.perf_counter() - t0
+    seconds = ttCore.runIn(ttCore.Session(), run)
+    with open('/proc/self/status') as f:
+        kb = [int(line.split()[1]) for line in f if line.startswith('VmRSS:')][0]
+    return (kb, seconds)
+
+def main(n, workers):
+    directory = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    directory = tempfile.mkdtemp(dir = directory)
+    ndjson = os.path.join(directory, 'library.ndjson')
+    library = os.path.join(directory, 'library.ttlib')
+    def publish():
+        with open(ndjson, 'w') as out:
+            for line in corpus(n):
+                s = ttParser.parse(line)
+                out.write(ttIngest.export(s) + '\n')
+                s.execute()
+        ttShared.publish(library)
+    ttCore.runIn(ttCore.Session(), publish)
+    print(str(2 * n + 5) + ' declarations: ' + str(os.path.getsize(library)) + ' bytes published')
+    with multiprocessing.get_context('spawn').Pool(workers, maxtasksperchild = 1) as pool:
+        for (how, path) in [('load', ndjson), ('attach', library)]:
+            results = pool.starmap(work, [(how, path, n)] * workers)
+            print(how + ': ' + ', '.join(str(kb // 1024) + ' MB in ' + str(round(seconds, 2)) + ' sec' for (kb, seconds) in results))
+    os.remove(ndjson)
+    os.remove(library)
+    os.rmdir(directory)
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000, int(sys.argv[2]) if len(sys.argv) > 2 else 4)
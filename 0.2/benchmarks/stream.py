@@ -0,0 +1,57 @@
+# The head of a large normal form: lazy evaluate versus evaluate
+# Run with: python benchmarks/stream.py [exponent]
+# The term is the Church numeral 2^n applied to a parameter successor, whose normal form has 2^n applications.
+# Evaluate returns nothing until the whole normal form is built; lazy evaluate streams it, so its first characters
+# come as soon as the head is reduced. Each run is in a fresh Session, so that nothing is memoized across runs.
+# Both run in a thread with a large stack, as the background threads of ttSpeculate do, since evaluate reads its
+# normal form back recursively.
+
+import itertools
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.setrecursionlimit(1000000)
+
+import ttCore
+import ttParser
+
+def definitions(n):
+    yield 'parameter N : type[0]'
+    yield 'parameter O : N'
+    yield 'parameter S : N -> N'
+    yield 'definition numeral := (T : type[0]) -> (T -> T) -> T -> T'
+    yield 'definition two : numeral := (T : type[0]) => (f : T -> T) => (x : T) => f (f x)'
+    yield 'definition exponent : numeral := (T : type[0]) => (f : T -> T) => (x : T) => ' + 'f (' * n + 'x' + ')' * n
+    yield 'definition power := (m : numeral) => (n : numeral) => (T : type[0]) => n (T -> T) (m T)'
+
+def run(n, statement, pieces):
+    '''The time until the first pieces of the result of statement, all of it if pieces is None, and its length.'''
+    def main():
+        for d in definitions(n):
+            ttParser.parse(d).execute()
+        t0 = time.perf_counter()
+        r = ttParser.parse(statement + ' power two exponent N S O').execute()
+        text = ''.join(itertools.islice(r, pieces)) if pieces != None else str(r)
+        return (time.perf_counter() - t0, len(text))
+    return ttCore.runIn(ttCore.Session(), main)
+
+def main(n):
+    for (name, statement, pieces) in [('evaluate', 'evaluate', None), ('lazy evaluate, first 100 pieces', 'lazy evaluate', 100),
+            ('lazy evaluate, all of it', 'lazy evaluate', None)]:
+        (seconds, length) = run(n, statement, pieces)
+        print(name + ': ' + str(length) + ' characters in ' + str(round(seconds, 2)) + ' sec')
+
+def inThread(f, stackSize = 512 * 1024 * 1024):
+    # The stack size is read when the thread starts
+    oldStackSize = threading.stack_size(stackSize)
+    try:
+        thread = threading.Thread(target = f)
+        thread.start()
+    finally:
+        threading.stack_size(oldStackSize)
+    thread.join()
+
+inThread(lambda: main(int(sys.argv[1]) if len(sys.argv) > 1 else 16))
@@ -0,0 +1,121 @@
+import ttCore
+from ttCore import *
+
+import ttCompile
+import ttErasure
+import ttErrors
+import ttIngest
+import ttParallel
+import ttParser
+import ttSerialize
+import ttStream
+
+import json
+import multiprocessing
+from collections import deque
+
+# Batch evaluation: one function applied to many inputs. The function is checked and normalized once, which
+# unfolds its definitions and reduces whatever doesn't depend on its argument, and its normal form is compiled.
+# Inputs are then streamed through it: each one is checked against the domain, normalized once too, compiled and
+# applied to the compiled function, and the normal form of the result is read back.
+# With a pool, the worker processes are forked once per batch, and each is handed the prepared function as it starts.
+# Inputs are checked before they are shipped in chunks, serialized by ttSerialize, and results are yielded in order.
+# Like parallel evaluate, pools fork the running process, which is expected to hold the only active Session and to
+# run no other thread. While others run, inputs are evaluated in the running process instead.
+
+class Mapper(object):
+    '''A closed function prepared for batch evaluation.'''
+    def __init__(self, function):
+        self.unsafe = session().unsafeMode
+        if not self.unsafe:
+            ttErasure.check(function)
+        p = function.type().normalize()
+        if not isinstance(p, TProduct):
+            raise ProductExpectedError(function)
+        self.domain = p.varType
+        self.value = ttCompile.compileTerm(ttCompile.evaluateCompiled(function))(None)
+    def check(self, input):
+        if not self.unsafe:
+            ttErasure.check(input)
+            if not convertible(input.type(), self.domain):
+                raise TypeMismatchError(input, input.type().normalize(), self.domain)
+    def evaluate(self, input):
+        '''The normal form of the function applied to a checked input.'''
+        return ttCompile.readBack(ttCompile.apply(self.value, ttCompile.closedValue(input)), 0)
+
+workerMapper = None # in a worker process, the Mapper of its pool
+
+def startWorker(mapper):
+    '''The initializer of the worker processes of a pool, which are forked, so that mapper isn't pickled.'''
+    global workerMapper
+    workerMapper = mapper
+
+def evaluateEncoded(chunk):
+    '''The worker's job.'''
+    return [ttSerialize.encode(workerMapper.evaluate(ttSerialize.decode(nodes))) for nodes in chunk]
+
+def chunks(mapper, inputs, size):
+    chunk = []
+    for input in inputs:
+        mapper.check(input)
+        chunk.append(ttSerialize.encode(input))
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def mapOver(function, inputs, processes = 1, chunkSize = 64):
+    '''Yield the normal forms of function applied to each of inputs, an iterable of closed terms, in order.
+    Inputs are evaluated in processes worker processes if there are more than one, one per CPU if it is None,
+    and pools can be forked.'''
+    mapper = Mapper(function)
+    if (processes == 1) or not ttParallel.forkable():
+        for input in inputs:
+            mapper.check(input)
+            yield mapper.evaluate(input)
+        return
+    # Inputs are read and checked here, in the active Session, a few chunks ahead of the results
+    window = 2 * (processes or multiprocessing.cpu_count())
+    pending = deque()
+    with ttParallel.forkPool(processes, startWorker, (mapper,)) as pool:
+        for chunk in chunks(mapper, inputs, chunkSize):
+            pending.append(pool.apply_async(evaluateEncoded, (chunk,)))
+            while len(pending) >= window:
+                for nodes in pending.popleft().get():
+                    yield ttSerialize.decode(nodes)
+        while pending:
+            for nodes in pending.popleft().get():
+                yield ttSerialize.decode(nodes)
+
+class Results(ttStream.Stream):
+    '''The normal forms of function applied to each input of the file path, a line each, streamed within limits
+    as mapOver yields them.'''
+    def __init__(self, function, path, processes, limits = {}):
+        super(Results, self).__init__(function, limits)
+        self.path = path
+        self.processes = processes
+    def pieces(self):
+        for (n, r) in enumerate(mapOver(self.term, inputs(self.path), self.processes)):
+            yield ('\n' if n > 0 else '') + str(r)
+
+def inputs(path):
+    '''The terms of a file of inputs, one per line: expressions, or ttSerialize node lists if it is an .ndjson file.'''
+    with open(path) as f:
+        for (n, line) in enumerate(f):
+            if line.strip() == '':
+                continue
+            try:
+                if path.endswith('.ndjson'):
+                    yield ttIngest.term(json.loads(line))
+                    continue
+                s = ttParser.parse(line)
+            except ValueError as e:
+                raise ttErrors.IngestionError(str(e), n + 1)
+            except ttErrors.IngestionError as e:
+                e.line = n + 1
+                raise
+            if isinstance(s, ttParser.SExpression):
+                yield s.term
+            elif s != None:
+                raise ttErrors.IngestionError('an input is expected to be an expression', n + 1)
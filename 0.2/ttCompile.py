@@ -0,0 +1,229 @@
+import ttCore
+from ttCore import *
+
+# Normalization by evaluation: closed terms are compiled into Python closures over an environment of values,
+# run natively and read back into Terms. No types are checked during the run, so terms must be checked beforehand.
+# Environments are linked (value, rest) pairs, de Bruijn index 1 being the head.
+
+class Value(object):
+    pass
+
+class VUniverse(Value):
+    def __init__(self, n):
+        self.n = n
+
+class VAbstraction(Value):
+    def __init__(self, name, domain, body):
+        '''domain is a thunk returning the value of the domain, body is a Python function from values to values.'''
+        self.name = name
+        self._domain = domain
+        self.body = body
+    def domain(self):
+        if not isinstance(self._domain, Value):
+            self._domain = self._domain()
+        return self._domain
+
+class VLambda(VAbstraction):
+    pass
+
+class VProduct(VAbstraction):
+    pass
+
+class VLevel(object):
+    '''A bound variable introduced while reading back a binder. Levels count binders from the outside.'''
+    def __init__(self, name, domain, level):
+        self.name = name
+        self.domain = domain
+        self.level = level
+        self._types = {}
+    def type(self, depth):
+        try:
+            return self._types[depth]
+        except KeyError:
+            r = self._types[depth] = readBack(self.domain, depth)
+            return r
+
+class VNeutral(Value):
+    '''A stuck application of a parameter Variable, a VLevel or a TPrimitive to a tuple of argument values.
+    Literals are primitives without arguments.'''
+    def __init__(self, head, args = ()):
+        self.head = head
+        self.args = args
+
+def apply(value, arg):
+    budget = ttCore.active.budget
+    if budget is not None:
+        budget.step()
+    if isinstance(value, VLambda):
+        return value.body(arg)
+    elif isinstance(value, VNeutral):
+        args = value.args + (arg,)
+        if isinstance(value.head, TPrimitive) and value.head.arity == len(args):
+            r = reducePrimitive(value.head, args)
+            if r != None:
+                return r
+        return VNeutral(value.head, args)
+    else:
+        raise ProductExpectedError(readBack(value, 0))
+
+def closedValue(term):
+    '''The value of a closed term, compiled and run once per term.'''
+    try:
+        return term._compiledValue
+    except AttributeError:
+        term._compiledValue = compileTerm(term)(None)
+        return term._compiledValue
+
+def natLiterals(args):
+    r = []
+    for a in args:
+        if not (isinstance(a, VNeutral) and isinstance(a.head, TNatLiteral)):
+            return None
+        r.append(a.head.n)
+    return r
+
+def reducePrimitive(head, args):
+    '''The value-level counterpart of TPrimitive._reduce.'''
+    if isinstance(head, TNatOperation):
+        ns = natLiterals(args)
+        if ns == None:
+            return None
+        r = head._compute(ns)
+        if isinstance(r, TNatLiteral):
+            return VNeutral(r)
+        return closedValue(r)
+    elif isinstance(head, TEliminator):
+        target = args[-1]
+        if not (isinstance(target, VNeutral) and isinstance(target.head, TConstructor) and (target.head.inductive is head.inductive) and
+            (len(target.args) == target.head.arity)):
+            return None
+        c = target.head
+        fields = target.args[head.inductive.params :]
+        r = args[head.inductive.params + 1 + c.index]
+        for f in fields:
+            r = apply(r, f)
+        eliminate = VNeutral(head, args[: -1])
+        for (f, recursive) in zip(fields, c.recursive):
+            if recursive:
+                r = apply(r, apply(eliminate, f))
+        return r
+    elif isinstance(head, TNatElim):
+        (P, z, s, n) = args
+        if isinstance(n, VNeutral) and isinstance(n.head, TNatLiteral):
+            if n.head.n == 0:
+                return z
+            m = VNeutral(TNatLiteral(n.head.n - 1))
+        elif isinstance(n, VNeutral) and isinstance(n.head, TNatSucc) and len(n.args) == 1:
+            m = n.args[0]
+        else:
+            return None
+        return apply(apply(s, m), apply(VNeutral(head, (P, z, s)), m))
+    else:
+        return None
+
+def globalValue(var):
+    '''The value of a global Variable, compiled and run once per Variable.'''
+    try:
+        return var._compiledValue
+    except AttributeError:
+        if var.value != None:
+            var._compiledValue = compileTerm(var.value)(None)
+        else:
+            var._compiledValue = VNeutral(var)
+        return var._compiledValue
+
+def compileTerm(term):
+    '''Compile a Term into a Python function from environments to values.'''
+    if isinstance(term, TBoundVariable):
+        return _compileBoundVariable(term.deBruijn)
+    elif isinstance(term, TGlobalVariable):
+        var = term.var
+        return lambda env: globalValue(var)
+    elif isinstance(term, TUniverse):
+        value = VUniverse(term.n)
+        return lambda env: value
+    elif isinstance(term, TAbstraction):
+        return _compileAbstraction(VLambda if isinstance(term, TLambda) else VProduct, term.name, compileTerm(term.varType), compileTerm(term.term))
+    elif isinstance(term, TApplication):
+        code1 = compileTerm(term.term1)
+        code2 = compileTerm(term.term2)
+        return lambda env: apply(code1(env), code2(env))
+    elif isinstance(term, TLet):
+        return _compileLet(compileTerm(term.value), compileTerm(term.term))
+    elif isinstance(term, TSubstitution):
+        return _compileSubstitution(term.sub, compileTerm(term.term))
+    elif isinstance(term, TPrimitive):
+        value = VNeutral(term)
+        return lambda env: value
+    elif isinstance(term, TConstructed):
+        return _compileConstructed(term.constructor, [compileTerm(a) for a in term.args])
+    else:
+        raise TypeError('Cannot compile ' + repr(term))
+
+def _compileBoundVariable(i):
+    if i == 1:
+        return lambda env: env[0]
+    elif i == 2:
+        return lambda env: env[1][0]
+    elif i == 3:
+        return lambda env: env[1][1][0]
+    def code(env):
+        for _ in range(i - 1):
+            env = env[1]
+        return env[0]
+    return code
+
+def _compileAbstraction(cls, name, domain, body):
+    return lambda env: cls(name, lambda: domain(env), lambda value: body((value, env)))
+
+def _compileLet(value, body):
+    return lambda env: body((value(env), env))
+
+def _compileConstructed(constructor, args):
+    return lambda env: VNeutral(constructor, tuple(a(env) for a in args))
+
+def _compileSubstitution(sub, code):
+    while isinstance(sub, SNormalized):
+        sub = sub.sub
+    entries = [compileTerm(sub[i + 1]) for i in range(sub.len)]
+    entries.reverse()
+    shift = sub.shift
+    def substituted(env):
+        r = env
+        for _ in range(shift):
+            r = r[1]
+        for entry in entries:
+            r = (entry(env), r)
+        return code(r)
+    return substituted
+
+def readBack(value, depth):
+    '''Turn a value living under depth binders back into a normal Term.'''
+    budget = ttCore.active.budget
+    if budget is not None:
+        budget.allocate()
+    if isinstance(value, VAbstraction):
+        level = VLevel(value.name, value.domain(), depth)
+        cls = TLambda if isinstance(value, VLambda) else TProduct
+        return cls(value.name, readBack(level.domain, depth), readBack(value.body(VNeutral(level)), depth + 1))
+    elif isinstance(value, VUniverse):
+        return TUniverse(value.n)
+    elif isinstance(value, VNeutral):
+        head = value.head
+        if isinstance(head, VLevel):
+            r = TBoundVariable(head.name, head.type(depth), depth - head.level)
+        elif isinstance(head, TConstructor) and (len(value.args) == head.arity):
+            return TConstructed(head, [readBack(arg, depth) for arg in value.args])
+        elif isinstance(head, TPrimitive):
+            r = head
+        else:
+            r = TGlobalVariable(head)
+        for arg in value.args:
+            r = TApplication(r, readBack(arg, depth))
+        return r
+    else:
+        raise TypeError('Cannot read back ' + repr(value))
+
+def evaluateCompiled(term):
+    '''Normalize a closed, checked term by compiling it.'''
+    return applications.normalize(term, lambda: readBack(compileTerm(term)(None), 0))
@@ -1,38 +1,453 @@
 import ttErrors
 from ttErrors import *
 
-globalContext = {} # to be initialized with a dict of global vars indexed by names
-unsafeMode = False
+import heapq
+import threading
+import time
+import weakref
+from collections import deque, OrderedDict
+
+class Session(object):
+    '''An independent checking session: its global context, a dict of global Variables indexed by names,
+    the resolvers declaring missing ones on demand, given a name and returning whether they did,
+    the mode and the default limits of its statements, and the ttTrace.Tracer recording its work, if any.
+    Terms and their memo entries may be shared by sessions, since a term refers to its global Variables themselves.'''
+    def __init__(self):
+        self.lock = threading.RLock() # serializes the registration of new Variables
+        self.context = {}
+        self.resolvers = []
+        self.unsafeMode = False
+        self.limits = {'steps': None, 'nodes': None, 'seconds': None} # the default Budget of statements, None meaning unlimited
+        self.tracer = None
+        self.speculator = None # the ttSpeculate.Speculator normalizing new definitions in the background, if any
+        self.dependents = {} # the reverse dependency index: Variable -> the set of Variables whose type or value refers to it
+        self.typeIndex = None # the ttSearch.TypeIndex of the context, created by the first search and kept up by index
+        self.jobs = None # the ttJobs.Jobs running in the background, created by the first one
+        declarePrimitives(self.context)
+    def fork(self):
+        '''A Session sharing the context, the indexes and the lock of this one, with a mode and limits of its own,
+        for a computation running alongside it.'''
+        s = Session.__new__(Session)
+        s.__dict__.update(self.__dict__)
+        s.limits = dict(self.limits)
+        return s
+    def index(self, var):
+        for r in references(var.type) | references(var.value):
+            self.dependents.setdefault(r, set()).add(var)
+        if self.typeIndex != None:
+            self.typeIndex.add(var)
+    def unindex(self, var):
+        for r in references(var.type) | references(var.value):
+            self.dependents[r].discard(var)
+        if self.typeIndex != None:
+            self.typeIndex.remove(var)
+    def transitiveDependents(self, var):
+        '''The Variables depending on var, directly or not, in dependency order: each after those it refers to.
+        The order of the context isn't one, since a redefinition may refer to Variables defined after it.'''
+        found = set()
+        stack = [var]
+        while stack:
+            for d in self.dependents.get(stack.pop(), ()):
+                if d not in found:
+                    found.add(d)
+                    stack.append(d)
+        # Topological sort of the dependents, the ready ones in the order of the context
+        position = dict((v, i) for (i, v) in enumerate(self.context.values()) if v in found)
+        waiting = dict((d, 0) for d in found)
+        for v in found:
+            for d in self.dependents.get(v, ()):
+                waiting[d] += 1
+        ready = [(position.get(d, len(position)), d.name, d) for d in self.dependents.get(var, ()) if waiting[d] == 0]
+        heapq.heapify(ready)
+        order = []
+        while ready:
+            v = heapq.heappop(ready)[2]
+            order.append(v)
+            for d in self.dependents.get(v, ()):
+                waiting[d] -= 1
+                if waiting[d] == 0:
+                    heapq.heappush(ready, (position.get(d, len(position)), d.name, d))
+        return order
+
+class ThreadState(threading.local):
+    '''The state of the computation running in a thread: the active Session and the Budget, if any.'''
+    session = None # set to the default Session once the primitives are defined
+    budget = None
+
+active = ThreadState()
+
+def session():
+    '''The active Session of the running thread.'''
+    return active.session
+
+def runIn(newSession, f):
+    '''Call f() with newSession as the active Session of the running thread.'''
+    oldSession = active.session
+    active.session = newSession
+    try:
+        return f()
+    finally:
+        active.session = oldSession
 
 def setUnsafeMode(newUnsafeMode):
-    global unsafeMode
-    unsafeMode = newUnsafeMode
+    active.session.unsafeMode = newUnsafeMode
+
+def setTracer(newTracer):
+    '''Install a ttTrace.Tracer in the active Session, or None to stop tracing, and return the previous one.'''
+    s = active.session
+    oldTracer = s.tracer
+    s.tracer = newTracer
+    return oldTracer
+
+def convertible(term1, term2):
+    '''Check whether two terms have the same normal form.'''
+    tracer = active.session.tracer
+    if tracer is not None:
+        tracer.begin('conversion')
+    try:
+        return term1.normalize() == term2.normalize()
+    finally:
+        if tracer is not None:
+            tracer.end('conversion')
+
+def unfold(var, f):
+    '''Call f, which works on the definition of var, recording the unfolding when tracing.'''
+    tracer = active.session.tracer
+    if tracer is None:
+        return f()
+    tracer.begin('unfold', var.name)
+    try:
+        return f()
+    finally:
+        tracer.end('unfold')
+
+class Budget(object):
+    '''Limits on the work of a computation, None meaning unlimited:
+        steps - the number of types and normal forms actually computed, memo hits excluded
+        nodes - the number of terms substitutions are applied to
+        seconds - wall-clock time, checked every 1024 steps
+    Exceeding a limit raises ResourceLimitError. Nothing is memoized for computations in progress,
+    so an aborted computation leaves no trace but the completed subcomputations.
+    Another thread may cancel() the computation, which then raises CancelledError at its next step,
+    as do the computations running within Budgets of their own inside it.'''
+    def __init__(self, steps = None, nodes = None, seconds = None):
+        self.steps = steps
+        self.nodes = nodes
+        self.seconds = seconds
+        self.stepCount = 0
+        self.nodeCount = 0
+        self.cancelled = False
+        self.outer = None # the Budget of the computation this one runs inside, if any
+        self.start = time.time()
+    def elapsed(self):
+        return time.time() - self.start
+    def exceeded(self, limit):
+        return ResourceLimitError(limit, self.stepCount, self.nodeCount, self.elapsed())
+    def cancel(self):
+        self.cancelled = True
+    def isCancelled(self):
+        b = self
+        while b is not None:
+            if b.cancelled:
+                return True
+            b = b.outer
+        return False
+    def step(self):
+        if self.cancelled or ((self.outer is not None) and self.outer.isCancelled()):
+            raise CancelledError()
+        self.stepCount += 1
+        if (self.steps != None) and (self.stepCount > self.steps):
+            raise self.exceeded('steps')
+        if (self.seconds != None) and (self.stepCount & 1023 == 0) and (self.elapsed() > self.seconds):
+            raise self.exceeded('seconds')
+    def allocate(self):
+        self.nodeCount += 1
+        if (self.nodes != None) and (self.nodeCount > self.nodes):
+            raise self.exceeded('nodes')
+
+def runWithin(newBudget, f):
+    '''Call f() with newBudget as the Budget of the computation running in the thread, inside the current one.'''
+    oldBudget = active.budget
+    if (newBudget.outer is None) and (oldBudget is not newBudget):
+        newBudget.outer = oldBudget
+    active.budget = newBudget
+    try:
+        return f()
+    finally:
+        active.budget = oldBudget
+
+class MemoStore(object):
+    '''The owner of all memoized weak head normal forms, normal forms and types of terms.
+    An entry is kept on its term, so it is released together with the term, and the store references the term weakly.
+    At most maxEntries entries are kept. When the budget is exceeded the references to collected terms are swept away,
+    then entries are evicted down to three quarters of the budget, so that sweeping is amortized.
+    Eviction follows the clock policy, an approximation of least recently used:
+    the oldest entry is evicted unless it has been used since it was last considered, in which case it gets a second chance.
+    The store is shared by all Sessions and threads, so entries are created and evicted under a lock.'''
+    USED = 0
+    LAZY = 1
+    NORMAL = 2
+    TYPE = 3
+    def __init__(self, maxEntries = 1000000):
+        self.maxEntries = maxEntries
+        self._refs = deque() # weak references to terms having an entry, oldest first
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.collected = 0
+        self.lock = threading.Lock()
+    def __len__(self):
+        return len(self._refs)
+    def put(self, term, slot, value):
+        e = term._memo
+        if e is None:
+            with self.lock:
+                e = term._memo
+                if e is None:
+                    # Room is made first, so that the new entry isn't the one evicted
+                    if len(self._refs) >= self.maxEntries:
+                        self.sweep()
+                        self._evict(self.maxEntries * 3 // 4)
+                    e = term._memo = [False, None, None, None]
+                    self._refs.append(weakref.ref(term))
+        e[slot] = value
+        return value
+    def _evict(self, maxEntries):
+        while len(self._refs) > maxEntries:
+            ref = self._refs.popleft()
+            term = ref()
+            if term is None:
+                self.collected += 1
+            elif term._memo is None:
+                self.collected += 1
+            elif term._memo[MemoStore.USED]:
+                term._memo[MemoStore.USED] = False
+                self._refs.append(ref)
+            else:
+                del term._memo
+                self.evictions += 1
+    def sweep(self):
+        '''Forget the references to collected terms.'''
+        live = deque(ref for ref in self._refs if (ref() is not None) and (ref()._memo is not None))
+        self.collected += len(self._refs) - len(live)
+        self._refs = live
+    def setBudget(self, maxEntries):
+        with self.lock:
+            self.maxEntries = maxEntries
+            self.sweep()
+            self._evict(maxEntries)
+    def forget(self, term):
+        '''Drop the entry of a term, if any. The store's reference to the term goes at the next sweep.'''
+        with self.lock:
+            if term._memo is not None:
+                del term._memo
+    def clear(self):
+        with self.lock:
+            for ref in self._refs:
+                term = ref()
+                if (term is not None) and (term._memo is not None):
+                    del term._memo
+            self._refs.clear()
+    def statistics(self):
+        return {'entries': len(self._refs), 'maxEntries': self.maxEntries, 'hits': self.hits, 'misses': self.misses,
+            'evictions': self.evictions, 'collected': self.collected}
+
+memo = MemoStore()
+
+class ApplicationMemo(object):
+    '''The normal forms of applications of global definitions of functions to closed arguments, shared by all the terms
+    applying a definition to equal arguments, whichever statement they come from. Entries are keyed by the Variable
+    and structural hashes of the arguments, and the arguments are compared on hits.
+    Entries are weighed by the size of their normal forms, those larger than a tenth of maxSize aren't kept,
+    and the least recently used ones are evicted while the total exceeds maxSize.'''
+    def __init__(self, maxSize = 1000000):
+        self.maxSize = maxSize
+        self.size = 0
+        self._entries = OrderedDict() # (Variable, hashes of the arguments) -> (arguments, normal form, size)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    def __len__(self):
+        return len(self._entries)
+    def spine(self, term):
+        '''The Variable and the arguments of an application of a definition of a function to closed arguments, or None.
+        Definitions are curried, so partial applications count: the normal form of plus m is as worth sharing as that of plus m n.'''
+        args = []
+        while isinstance(term, TApplication):
+            if term.term2.loose != 0:
+                return None
+            args.append(term.term2)
+            term = term.term1
+        if not (isinstance(term, TGlobalVariable) and isinstance(term.var.value, TLambda)):
+            return None
+        args.reverse()
+        return (term.var, args)
+    def get(self, var, args):
+        key = (var, tuple(structuralHash(a) for a in args))
+        with self.lock:
+            e = self._entries.get(key)
+            if (e != None) and all(a1 == a2 for (a1, a2) in zip(e[0], args)):
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return e[1]
+            self.misses += 1
+            return None
+    def put(self, var, args, normal):
+        maxEntrySize = self.maxSize // 10
+        size = termSize(normal, maxEntrySize)
+        if size >= maxEntrySize:
+            return normal
+        key = (var, tuple(structuralHash(a) for a in args))
+        with self.lock:
+            if key in self._entries:
+                self.size -= self._entries.pop(key)[2]
+            self._entries[key] = (args, normal, size)
+            self.size += size
+            self._evict(self.maxSize)
+        return normal
+    def normalize(self, term, normalize):
+        '''The normal form of term, computed by normalize() unless term applies a definition to closed arguments
+        which have been normalized with it before, in which case the shared normal form is returned.'''
+        spine = self.spine(term)
+        if spine == None:
+            return normalize()
+        r = self.get(*spine)
+        if r == None:
+            r = self.put(spine[0], spine[1], normalize())
+        return r
+    def _evict(self, maxSize):
+        while self.size > maxSize:
+            self.size -= self._entries.popitem(last = False)[1][2]
+            self.evictions += 1
+    def setBudget(self, maxSize):
+        with self.lock:
+            self.maxSize = maxSize
+            self._evict(maxSize)
+    def forget(self, variables):
+        '''Drop the entries of the definitions in variables and of the applications to arguments referring to them.'''
+        with self.lock:
+            for (key, e) in list(self._entries.items()):
+                if (key[0] in variables) or any(references(a) & variables for a in e[0]):
+                    self.size -= self._entries.pop(key)[2]
+    def clear(self):
+        with self.lock:
+            self._entries.clear()
+            self.size = 0
+    def statistics(self):
+        return {'entries': len(self._entries), 'size': self.size, 'maxSize': self.maxSize, 'hits': self.hits, 'misses': self.misses,
+            'evictions': self.evictions}
+
+applications = ApplicationMemo()
+
+def structuralHash(term):
+    '''A hash of a term compatible with ==, computed once per term. Substitutions and lets are hashed by identity.'''
+    try:
+        return term._structuralHash
+    except AttributeError:
+        pass
+    if isinstance(term, TBoundVariable):
+        h = hash(('bound', term.deBruijn))
+    elif isinstance(term, TGlobalVariable):
+        h = hash(('global', id(term.var)))
+    elif isinstance(term, TUniverse):
+        h = hash(('universe', term.n))
+    elif isinstance(term, TNatLiteral):
+        h = hash(('nat', term.n))
+    elif isinstance(term, TConstructed):
+        h = hash(('constructed', id(term.constructor)) + tuple(structuralHash(a) for a in term.args))
+    elif isinstance(term, TDeclaredPrimitive):
+        h = hash(('declared', id(term)))
+    elif isinstance(term, TPrimitive):
+        h = hash(('primitive', term.__class__))
+    elif isinstance(term, TAbstraction):
+        h = hash((term.__class__, structuralHash(term.varType), structuralHash(term.term)))
+    elif isinstance(term, TApplication):
+        h = hash(('application', structuralHash(term.term1), structuralHash(term.term2)))
+    else:
+        h = hash(('other', id(term)))
+    term._structuralHash = h
+    return h
+
+def termSize(term, limit):
+    '''The number of distinct nodes of a term, counted up to limit.'''
+    seen = set()
+    stack = [term]
+    while stack and (len(seen) < limit):
+        t = stack.pop()
+        if id(t) not in seen:
+            seen.add(id(t))
+            stack.extend(t.children())
+    return len(seen)
 
 class Variable(object):
     '''A unique global variable. Occurrences of variable terms inside expressions are irrelevant.'''
-    global globalContext
-    def __new__(cls, name, type = None, value = None, context = globalContext, new = False):
+    inferred = False # whether the type was inferred from the value
+    broken = None # the error which broke the definition when it was rechecked after a redefinition, if any
+    def __new__(cls, name, type = None, value = None, context = None, new = False):
         '''Calling Variable(name, context) refers to an existing variable in context.
-        Calling Variable(name, context, new = True) creates a new one, unless it already exists, in which case an error occurs.'''
+        Calling Variable(name, context, new = True) creates a new one, unless it already exists, in which case an error occurs.
+        The context defaults to the one of the active Session, whose resolvers are tried for missing variables.'''
+        s = active.session
+        if context is None:
+            context = s.context
         if new:
-            if name in context:
+            if (name in context) and not shadowable(context[name]):
                 raise VariableExists(name)
             return super(Variable, cls).__new__(cls)
         else:
+            if (name not in context) and (context is s.context):
+                for resolve in s.resolvers:
+                    if resolve(name):
+                        break
             try:
-                return context[name]
+                var = context[name]
             except KeyError:
                 raise UnknownVariableError(name)
-    def __init__(self, name, type = None, value = None, context = globalContext, new = False):
+            if var.broken != None:
+                raise BrokenDefinitionError(name, var.broken)
+            return var
+    def __init__(self, name, type = None, value = None, context = None, new = False):
         if not new:
             return
         self.name = name
         self.type = type
         self.value = value
-        context[name] = self
+        s = active.session
+        if context is None:
+            context = s.context
+        if (s is None) or (context is not s.context):
+            context.pop(name, None)
+            context[name] = self
+            return
+        # Registering is the last step, so that an interrupted definition leaves no Variable behind
+        with s.lock:
+            if (name in context) and not shadowable(context[name]):
+                raise VariableExists(name)
+            s.index(self)
+            # A shadowed primitive goes, but the terms referring to it keep it
+            context.pop(name, None)
+            context[name] = self
     def __repr__(self):
         return 'Variable(' + repr(self.name) + ', type = ' + repr(self.type) + ', value = ' + repr(self.value) + ')'
 
+def undeclare(var, previous = None, context = None):
+    '''Undo the registration of the new Variable var in context, which defaults to the one of the active Session,
+    restoring the Variable it shadowed, if any.'''
+    s = active.session
+    if context is None:
+        context = s.context
+    if (s is None) or (context is not s.context):
+        del context[var.name]
+        if previous != None:
+            context[var.name] = previous
+        return
+    with s.lock:
+        s.unindex(var)
+        del context[var.name]
+        if previous != None:
+            context[var.name] = previous
+
 class Term(object):
     '''An abstract base class of terms.
     All concrete Terms are expected to implement:
@@ -40,40 +455,125 @@ class Term(object):
         _type() - Infer the term's type.
         _normalize() - Normalize eagerly.
         _normalizeLazily() - Normalize lazily.
-        _apply(sub) - apply a substitution.'''
+        _apply(sub) - apply a substitution.
+        children() - The direct subterms and substitutions, for traversals of the term graph.
+    They also set loose on construction, a bound on the highest loose de Bruijn index of the term, 0 if it is closed.
+    Substitutions leave closed terms unchanged. Types of variables don't count, since bound variables are well scoped.'''
     def __eq__(self, term):
         return self._identical(term)
-    def update(self):
-        if not hasattr(self, '_current'):
-            self._current = self
-        if self._current is not self:
-            self._current = self._current.update()
-        return self._current
+    # Terms which are their own normal form and cheap to type, like variables, aren't memoized
+    memoized = True
+    _memo = None # the MemoStore entry of the term
     def type(self):
-        self.update()
-        if not hasattr(self, '_currentType'):
-            if self._current is self:
-                self._currentType = self._current._type()
+        if not self.memoized:
+            return self._type()
+        e = self._memo
+        if (e is not None) and (e[MemoStore.TYPE] is not None):
+            memo.hits += 1
+            e[MemoStore.USED] = True
+            return e[MemoStore.TYPE]
+        memo.misses += 1
+        budget = active.budget
+        if budget is not None:
+            budget.step()
+        tracer = active.session.tracer
+        if tracer is not None:
+            tracer.begin('type', self.__class__.__name__)
+        try:
+            if e is None:
+                r = self._type()
+            elif (e[MemoStore.NORMAL] is not None) and (e[MemoStore.NORMAL] is not self):
+                r = e[MemoStore.NORMAL].type()
+            elif (e[MemoStore.LAZY] is not None) and (e[MemoStore.LAZY] is not self):
+                r = e[MemoStore.LAZY].type()
             else:
-                self._currentType = self._current.type()
-        return self._currentType
+                r = self._type()
+        finally:
+            if tracer is not None:
+                tracer.end('type')
+        return memo.put(self, MemoStore.TYPE, r)
     def normalize(self):
-        self.update()
-        if self._current is self:
-            self._current = self._current._normalize()
-        else:
-            self._current = self._current.normalize()
-        return self._current
+        if not self.memoized:
+            return self._normalize()
+        e = self._memo
+        if (e is not None) and (e[MemoStore.NORMAL] is not None):
+            memo.hits += 1
+            e[MemoStore.USED] = True
+            return e[MemoStore.NORMAL]
+        memo.misses += 1
+        budget = active.budget
+        if budget is not None:
+            budget.step()
+        tracer = active.session.tracer
+        if tracer is not None:
+            tracer.begin('normalize', self.__class__.__name__)
+        try:
+            if (e is not None) and (e[MemoStore.LAZY] is not None) and (e[MemoStore.LAZY] is not self):
+                r = e[MemoStore.LAZY].normalize()
+            else:
+                r = self._normalize()
+        finally:
+            if tracer is not None:
+                tracer.end('normalize')
+        return memo.put(self, MemoStore.NORMAL, r)
     def normalizeLazily(self):
-        self.update()
-        if self._current is self:
-            self._current = self._current._normalizeLazily()
-        else:
-            self._current = self._current.normalizeLazily()
-        return self._current
+        if not self.memoized:
+            return self._normalizeLazily()
+        e = self._memo
+        if e is not None:
+            if e[MemoStore.NORMAL] is not None:
+                memo.hits += 1
+                e[MemoStore.USED] = True
+                return e[MemoStore.NORMAL]
+            elif e[MemoStore.LAZY] is not None:
+                memo.hits += 1
+                e[MemoStore.USED] = True
+                return e[MemoStore.LAZY]
+        memo.misses += 1
+        budget = active.budget
+        if budget is not None:
+            budget.step()
+        tracer = active.session.tracer
+        if tracer is not None:
+            tracer.begin('normalizeLazily', self.__class__.__name__)
+        try:
+            r = self._normalizeLazily()
+        finally:
+            if tracer is not None:
+                tracer.end('normalizeLazily')
+        return memo.put(self, MemoStore.LAZY, r)
+    def abbreviation(self, length = 300):
+        '''The printed term cut after length characters, printing no more than that of it.'''
+        r = []
+        n = 0
+        for piece in pieces(self):
+            r.append(piece)
+            n = n + len(piece)
+            if n > length:
+                return ''.join(r)[: length] + '...'
+        return ''.join(r)
+
+def subterms(term):
+    '''The distinct terms and substitutions a term is made of, the cached parts of substitutions included.'''
+    seen = {}
+    stack = [term]
+    while stack:
+        t = stack.pop()
+        if (t is None) or (id(t) in seen):
+            continue
+        seen[id(t)] = t
+        stack.extend(t.children())
+        if isinstance(t, SComposition):
+            stack.extend(t._lazySubs.values())
+    return seen.values()
+
+def references(term):
+    '''The global Variables a term refers to.'''
+    return set(t.var for t in subterms(term) if isinstance(t, TGlobalVariable))
 
 class TGlobalVariable(Term):
     '''A global Variable term'''
+    loose = 0
     def __init__(self, var):
         self.var = var
     def __repr__(self):
@@ -86,23 +586,27 @@ class TGlobalVariable(Term):
         return self.var.type
     def _normalize(self):
         if self.var.value != None:
-            return self.var.value.normalize()
+            return unfold(self.var, self.var.value.normalize)
         else:
             return self
     def _normalizeLazily(self):
         if self.var.value != None:
-            return self.var.value.normalizeLazily()
+            return unfold(self.var, self.var.value.normalizeLazily)
         else:
             return self
     def _apply(self, sub):
         return self
+    def children(self):
+        return ()
 
 class TBoundVariable(Term):
+    memoized = False
     def __init__(self, name, varType, deBruijn):
         '''varType is the type within the context where the variable occurs. Thus it has to be shifted all along.'''
         self.name = name
         self.varType = varType
         self.deBruijn = deBruijn
+        self.loose = deBruijn
     def __repr__(self):
         return 'TBoundVariable(' + repr(self.name) + ', ' + repr(self.varType) + ', ' + repr(self.deBruijn) + ')'
     def __str__(self):
@@ -116,19 +620,19 @@ class TBoundVariable(Term):
     def _normalizeLazily(self):
         return self
     def _apply(self, sub):
-#       print(self.__class__.__name__ + '._apply:')
-#       print('    self: ' + str(self))
-#       print('    self.type: ' + str(self.type()))
-#       print('    sub: ' + str(sub))
         if sub.len >= self.deBruijn:
-            if unsafeMode or ((sub * self.type()).normalize() == sub[self.deBruijn].type().normalize()):
+            if sub.verified or active.session.unsafeMode or convertible(sub * self.type(), sub[self.deBruijn].type()):
                 return sub[self.deBruijn]
             else:
                 raise TypeMismatchError(sub[self.deBruijn], sub[self.deBruijn].type().normalize(), (sub * self.type()).normalize())
         else:
             return TBoundVariable(self.name, TSubstitution(self.varType, sub), self.deBruijn - sub.len + sub.shift)
+    def children(self):
+        return (self.varType,) if self.varType != None else ()
 
 class TUniverse(Term):
+    memoized = False
+    loose = 0
     def __init__(self, n):
         self.n = n
     def __repr__(self):
@@ -145,6 +649,8 @@ class TUniverse(Term):
         return self
     def _apply(self, sub):
         return self
+    def children(self):
+        return ()
 
 class TAbstraction(Term):
     '''An abstract Abstraction term.'''
@@ -152,23 +658,22 @@ class TAbstraction(Term):
         self.name = name
         self.varType = type
         self.term = term
+        self.loose = max(type.loose, term.loose - 1)
     def _identical(self, term):
         return (self is term) or (isinstance(term, self.__class__) and (self.varType == term.varType) and (self.term == term.term))
     def _normalize(self):
-#       print(self.__class__.__name__ + '._normalize:')
-#       print('    self: ' + str(self))
-#       print('    self.type: ' + str(self.type()))
         return self.__class__(self.name, self.varType.normalize(), self.term.normalize())
     def _normalizeLazily(self):
         return self
     def _apply(self, sub):
-#       print(self.__class__.__name__ + '._apply: ' + str(self) + ' | ' + str(sub))
         s = Substitution(shift = 1) * sub
 #       s.subs.append(TBoundVariable(self.name, s * self.varType, 1))
-        s = SConcat(s, TBoundVariable(self.name, TSubstitution(self.varType, s), 1))
+        s = SConcat(s, TBoundVariable(self.name, TSubstitution(self.varType, s), 1), verified = True)
 #       s = Substitution(shift = s.shift, subs = s.subs + [TBoundVariable(self.name, TSubstitution(self.varType, s), 1)])
         # It's dangerous to modify the data inside s here
         return self.__class__(self.name, TSubstitution(self.varType, sub), TSubstitution(self.term, s))
+    def children(self):
+        return (self.varType, self.term)
 
 class TProduct(TAbstraction):
     def __init__(self, name, type, term):
@@ -203,9 +708,11 @@ class TLambda(TAbstraction):
         return TProduct(self.name, self.varType, self.term.type())
 
 class TApplication(Term):
+    checked = False # whether the type of the argument is known to be the domain, so that it is substituted without checks
     def __init__(self, term1, term2):
         self.term1 = term1
         self.term2 = term2
+        self.loose = max(term1.loose, term2.loose)
     def __repr__(self):
         return 'TApplication(' + repr(self.term1) + ', ' + repr(self.term2) + ')'
     def __str__(self):
@@ -216,28 +723,96 @@ class TApplication(Term):
         t = self.term1.type().normalizeLazily()
         if not isinstance(t, TProduct):
             raise ProductExpectedError(self.term1)
-        return TSubstitution(t.term, Substitution(subs = [self.term2]))
+        # The argument is checked once here, rather than wherever its variable is substituted
+        if not active.session.unsafeMode:
+            if not convertible(t.varType, self.term2.type()):
+                raise TypeMismatchError(self.term2, self.term2.type().normalize(), t.varType.normalize())
+            self.checked = True
+        if t.term.loose == 0:
+            return t.term
+        return TSubstitution(t.term, Substitution(subs = [self.term2], verified = self.checked))
+    def normalize(self):
+        # Applications of definitions share their normal forms, unless this one has its own already
+        e = self._memo
+        spine = applications.spine(self) if (e is None) or (e[MemoStore.NORMAL] is None) else None
+        if spine == None:
+            return super(TApplication, self).normalize()
+        r = applications.get(*spine)
+        if r == None:
+            return applications.put(spine[0], spine[1], super(TApplication, self).normalize())
+        return memo.put(self, MemoStore.NORMAL, r)
     def _normalize(self):
         t = self.term1.normalizeLazily()
         if isinstance(t, TLambda):
-            return TSubstitution(t.normalize().term, Substitution(subs = [self.term2.normalize()])).normalize()
+            return TSubstitution(t.normalize().term, Substitution(subs = [self.term2.normalize()], verified = self.checked)).normalize()
+        r = primitiveRedex(t, self.term2)
+        if r != None:
+            return r.normalize()
         else:
-            return TApplication(t.normalize(), self.term2.normalize())
+            # Reduction preserves types, so the normal form is as checked as the term
+            r = TApplication(t.normalize(), self.term2.normalize())
+            r.checked = self.checked
+            return r
     def _normalizeLazily(self):
         t = self.term1.normalizeLazily()
         if isinstance(t, TLambda):
-            return TSubstitution(t.term, Substitution(subs = [self.term2])).normalizeLazily()
+            return TSubstitution(t.term, Substitution(subs = [self.term2], verified = self.checked)).normalizeLazily()
+        r = primitiveRedex(t, self.term2)
+        if r != None:
+            return r.normalizeLazily()
         else:
-            return TApplication(t, self.term2)
+            r = TApplication(t, self.term2)
+            r.checked = self.checked
+            return r
+    def _apply(self, sub):
+        r = TApplication(sub * self.term1, sub * self.term2)
+        r.checked = self.checked and sub.verified
+        return r
+    def children(self):
+        return (self.term1, self.term2)
+
+class TLet(Term):
+    '''A local definition: variable 1 of term stands for value, whose type is varType.
+    The value is type-checked once and reduces by substitution, so that all occurrences share it and its normal form.'''
+    checked = False # whether the type of the value is known to be varType, as for TApplication
+    def __init__(self, name, type, value, term):
+        self.name = name
+        self.varType = type
+        self.value = value
+        self.term = term
+        self.loose = max(type.loose if type != None else 0, value.loose, term.loose - 1)
+    def __repr__(self):
+        return 'TLet(' + repr(self.name) + ', ' + repr(self.varType) + ', ' + repr(self.value) + ', ' + repr(self.term) + ')'
+    def __str__(self):
+        return '(let ' + self.name + ' := ' + str(self.value) + ' in ' + str(self.term) + ')'
+    def _identical(self, term):
+        return (self is term) or (isinstance(term, TLet) and (self.value == term.value) and (self.term == term.term))
+    def _type(self):
+        if not active.session.unsafeMode:
+            if not convertible(self.value.type(), self.varType):
+                raise TypeMismatchError(self.value, self.value.type().normalize(), self.varType.normalize())
+            self.checked = True
+        return TSubstitution(self.term.type(), Substitution(subs = [self.value], verified = self.checked))
+    def _normalize(self):
+        return TSubstitution(self.term, Substitution(subs = [self.value], verified = self.checked)).normalize()
+    def _normalizeLazily(self):
+        return TSubstitution(self.term, Substitution(subs = [self.value], verified = self.checked)).normalizeLazily()
     def _apply(self, sub):
-        return TApplication(sub * self.term1, sub * self.term2)
+        s = Substitution(shift = 1) * sub
+        s = SConcat(s, TBoundVariable(self.name, TSubstitution(self.varType, s), 1), verified = True)
+        return TLet(self.name, TSubstitution(self.varType, sub), TSubstitution(self.value, sub), TSubstitution(self.term, s))
+    def children(self):
+        return (self.varType, self.value, self.term) if self.varType != None else (self.value, self.term)
 
 class Substitution(object):
-    def __init__(self, subs = [], shift = 0):
-        '''subs is a list of substitutions for de Bruijn variables. Var i is substituted for subs[i - 1], the remaining indices are shifted.'''
+    def __init__(self, subs = [], shift = 0, verified = False):
+        '''subs is a list of substitutions for de Bruijn variables. Var i is substituted for subs[i - 1], the remaining indices are shifted.
+        verified tells that the kernel has proved the type of each entry to be the type of its variable under the substitution,
+        so that variables are substituted without checks. Substitutions made by users are checked variable by variable.'''
         self._subs = subs
         self.len = len(subs)
         self.shift = shift
+        self.verified = verified or (self.len == 0)
     def __repr__(self):
         return 'Substitution(subs = ' + repr(self._subs) + ', shift = ' + repr(self.shift) + ')'
     def __str__(self):
@@ -248,6 +823,12 @@ class Substitution(object):
         return r[2:]
     def __getitem__(self, key):
         return self._subs[key - 1]
+    def looseBound(self, n):
+        '''A bound on the loose indices of a term with loose n after applying self.'''
+        r = n - self.len + self.shift if n > self.len else 0
+        for i in range(min(n, self.len)):
+            r = max(r, self[i + 1].loose)
+        return r
     def __mul__(self, other):
         if isinstance(other, Substitution):
             return SComposition(self, other)
@@ -256,14 +837,21 @@ class Substitution(object):
 #            else:
 #                return Substitution([TSubstitution(t, self) for t in other.subs], shift = self.shift + other.shift - len(self.subs))
         elif isinstance(other, Term):
+            if (other.loose == 0) or ((self.len == 0) and (self.shift == 0)):
+                return other
+            budget = active.budget
+            if budget is not None:
+                budget.allocate()
             return other._apply(self)
         else:
             return NotImplemented
     def __eq__(self, sub):
         return (self is sub) or ((self.__class__ is Substitution) and (sub.__class__ is Substitution) and (self.shift == sub.shift) and (self.len == sub.len) and
-            all(self[i] == t2 for t1, t2 in zip(self._subs, sub._subs)))
+            all(t1 == t2 for t1, t2 in zip(self._subs, sub._subs)))
     def normalize(self):
         return SNormalized(self)
+    def children(self):
+        return tuple(self._subs)
 
 class SComposition(Substitution):
     def __init__(self, sub1, sub2):
@@ -275,6 +863,7 @@ class SComposition(Substitution):
         else:
             self.shift = self.sub1.shift + self.sub2.shift - self.sub1.len
             self.len = self.sub2.len
+        self.verified = sub1.verified and sub2.verified
         self._lazySubs = {}
         for i in range(self.len):
             self[i + 1]
@@ -283,18 +872,24 @@ class SComposition(Substitution):
             return self._lazySubs[key]
         except KeyError:
             if (self.sub2.shift >= self.sub1.len) or (key <= self.sub2.len):
-                r = TSubstitution(self.sub2[key], self.sub1)
+                r = self.sub2[key]
+                if r.loose != 0:
+                    r = TSubstitution(r, self.sub1)
             else:
                 r = self.sub1[key + self.sub2.shift - self.sub2.len]
             self._lazySubs[key] = r
             return r
+    def children(self):
+        return (self.sub1, self.sub2)
 
 class SConcat(Substitution):
-    def __init__(self, sub, term):
+    def __init__(self, sub, term, verified = False):
+        '''verified tells that the type of term is the type of variable 1 under the substitution.'''
         self.sub = sub
         self.term = term
         self.shift = sub.shift
         self.len = sub.len + 1
+        self.verified = verified and sub.verified
         for i in range(self.len):
             self[i + 1]
     def __getitem__(self, key):
@@ -302,21 +897,29 @@ class SConcat(Substitution):
             return self.term
         else:
             return self.sub[key - 1]
+    def children(self):
+        return (self.sub, self.term)
 
 class SNormalized(Substitution):
     def __init__(self, sub):
         self.sub = sub
         self.shift = sub.shift
         self.len = sub.len
+        self.verified = sub.verified
     def __getitem__(self, key):
         return self.sub[key].normalize()
+    def looseBound(self, n):
+        return self.sub.looseBound(n)
     def normalize(self):
         return self
+    def children(self):
+        return (self.sub,)
 
 class TSubstitution(Term):
     def __init__(self, term, sub):
         self.term = term
         self.sub = sub
+        self.loose = sub.looseBound(term.loose) if term.loose != 0 else 0
     def __repr__(self):
         return 'TSubstitution(' + repr(self.term) + ', ' + repr(self.sub) + ')'
     def __str__(self):
@@ -326,12 +929,389 @@ class TSubstitution(Term):
     def _type(self):
         return TSubstitution(self.term.type(), self.sub)
     def _normalize(self):
-#       print(self.__class__.__name__ + '._normalize:')
-#       print('    self: ' + str(self))
-#       print('    self.type: ' + str(self.type()))
+        if self.term.loose == 0:
+            return self.term.normalize()
         return (self.sub.normalize() * self.term.normalize()).normalize()
     def _normalizeLazily(self):
+        if self.term.loose == 0:
+            return self.term.normalizeLazily()
         return (self.sub * self.term).normalizeLazily()
     def _apply(self, sub):
         return TSubstitution(self.term, sub * self.sub)
+    def children(self):
+        return (self.term, self.sub)
+
+
+def pieces(term, reduce = None):
+    '''Yield the printed form of term in pieces from left to right, each subterm being replaced by reduce(subterm)
+    first if reduce is given. Pending subterms are kept on an explicit stack, so that deep terms don't nest generators.'''
+    stack = [term]
+    while stack:
+        t = stack.pop()
+        if isinstance(t, str):
+            yield t
+            continue
+        if reduce != None:
+            t = reduce(t)
+        if isinstance(t, TLambda):
+            parts = ['(' + t.name + ' : ' if t.name != '' else '(', t.varType, ' => ', t.term, ')']
+        elif isinstance(t, TProduct):
+            parts = ['((' + t.name + ' : ' if t.name != '' else '(', t.varType, ') -> ' if t.name != '' else ' -> ', t.term, ')']
+        elif isinstance(t, TApplication):
+            parts = ['(', t.term1, ' ', t.term2, ')']
+        elif isinstance(t, TConstructed):
+            parts = ['(' * len(t.args) + str(t.constructor)]
+            for a in t.args:
+                parts.extend([' ', a, ')'])
+        else:
+            yield str(t)
+            continue
+        stack.extend(reversed(parts))
+
+def syntacticChildren(node):
+    '''The children of a node as it is printed: those of a bound variable are the type it carries, which isn't.'''
+    return () if isinstance(node, TBoundVariable) else node.children()
+
+class TermStatistics(object):
+    '''Size and shape of a term graph as it is printed, computed in time linear in the number of distinct nodes:
+        dagSize - the number of distinct nodes, substitutions included
+        treeSize - the number of nodes of the fully unfolded tree
+        depth - the length of the longest path from the root
+        binderDepth - the largest number of nested binders
+        classes - node counts by class name
+        globals - the global Variables referenced
+        shared - the largest shared subterms as (tree size, number of references, term) triples
+        typeSize - the number of distinct nodes of the types carried by bound variables, which are counted apart'''
+    def __init__(self, term, maxShared = 5):
+        nodes = {}
+        parents = {}
+        treeSize = {}
+        depth = {}
+        binderDepth = {}
+        stack = [(term, False)]
+        while stack:
+            (node, expanded) = stack.pop()
+            key = id(node)
+            cs = syntacticChildren(node)
+            if expanded:
+                treeSize[key] = 1 + sum(treeSize[id(c)] for c in cs)
+                depth[key] = 1 + max([depth[id(c)] for c in cs] + [0])
+                if isinstance(node, (TAbstraction, TLet)):
+                    binderDepth[key] = max([binderDepth[id(c)] for c in cs[: -1]] + [1 + binderDepth[id(node.term)]])
+                else:
+                    binderDepth[key] = max([binderDepth[id(c)] for c in cs] + [0])
+            elif key not in nodes:
+                nodes[key] = node
+                stack.append((node, True))
+                for c in cs:
+                    parents[id(c)] = parents.get(id(c), 0) + 1
+                    if id(c) not in nodes:
+                        stack.append((c, False))
+        self.dagSize = len(nodes)
+        self.treeSize = treeSize[id(term)]
+        self.depth = depth[id(term)]
+        self.binderDepth = binderDepth[id(term)]
+        self.classes = {}
+        self.globals = set()
+        for node in nodes.values():
+            name = node.__class__.__name__
+            self.classes[name] = self.classes.get(name, 0) + 1
+            if isinstance(node, TGlobalVariable):
+                self.globals.add(node.var)
+        shared = [(treeSize[key], n, nodes[key]) for (key, n) in parents.items() if (n > 1) and isinstance(nodes[key], Term)]
+        self.shared = heapq.nlargest(maxShared, shared, key = lambda s: s[0])
+        types = set()
+        stack = [node.varType for node in nodes.values() if isinstance(node, TBoundVariable) and (node.varType != None)]
+        while stack:
+            t = stack.pop()
+            if (id(t) not in nodes) and (id(t) not in types):
+                types.add(id(t))
+                stack.extend(t.children())
+        self.typeSize = len(types)
+    def sharingRatio(self):
+        return self.treeSize / self.dagSize
+    def __str__(self):
+        r = str(self.dagSize) + ' nodes as a DAG, ' + str(self.treeSize) + ' as a tree (sharing ratio ' + str(round(self.sharingRatio(), 2)) + ')\n'
+        r = r + 'depth ' + str(self.depth) + ', binder depth ' + str(self.binderDepth) + '\n'
+        r = r + ', '.join(name + ': ' + str(n) for (name, n) in sorted(self.classes.items())) + '\n'
+        r = r + str(len(self.globals)) + ' global definitions referenced: ' + ' '.join(sorted(var.name for var in self.globals)) + '\n'
+        r = r + 'types of bound variables: ' + str(self.typeSize) + ' more nodes'
+        for (size, n, t) in self.shared:
+            r = r + '\n    ' + str(size) + ' nodes, referenced ' + str(n) + ' times: ' + describe(t)
+        return r
+
+def describe(term, maxSize = 20):
+    '''A printable form of term, abbreviated to its head and argument count unless the term is small.'''
+    if TermStatistics(term, 0).treeSize <= maxSize:
+        return str(term)
+    args = 0
+    while isinstance(term, TApplication):
+        args = args + 1
+        term = term.term1
+    if isinstance(term, (TGlobalVariable, TBoundVariable, TPrimitive)):
+        head = str(term)
+        if args == 0:
+            return head
+    else:
+        head = term.__class__.__name__
+    return '(' + head + ' ...)' if args == 0 else '(' + head + ' applied to ' + str(args) + ' arguments)'
+
+class TPrimitive(Term):
+    '''An abstract base class of primitive constants. Once applied to arity arguments they reduce natively:
+        _reduce(args) - Return the reduct of the saturated application or None if it is stuck.'''
+    arity = 0
+    loose = 0
+    def __repr__(self):
+        return self.__class__.__name__ + '()'
+    def __str__(self):
+        return self.name
+    def _identical(self, term):
+        return (self is term) or (term.__class__ is self.__class__)
+    def _normalize(self):
+        return self
+    def _normalizeLazily(self):
+        return self
+    def _apply(self, sub):
+        return self
+    def children(self):
+        return ()
+
+def primitiveRedex(term, arg):
+    '''Reduce the application of a weak head normal term to arg if it is a saturated primitive application.'''
+    args = [arg]
+    while isinstance(term, TApplication) and len(args) < TPrimitive.maxArity:
+        args.append(term.term2)
+        term = term.term1
+    if isinstance(term, TPrimitive) and term.arity == len(args):
+        args.reverse()
+        return term._reduce(args)
+    else:
+        return None
+
+# Natural numbers backed by Python ints
+
+class TNat(TPrimitive):
+    name = 'Nat'
+    def _type(self):
+        return TUniverse(0)
+
+class TNatLiteral(TPrimitive):
+    memoized = False
+    def __init__(self, n):
+        self.n = n
+    def __repr__(self):
+        return 'TNatLiteral(' + repr(self.n) + ')'
+    def __str__(self):
+        return str(self.n)
+    def _identical(self, term):
+        return (self is term) or (isinstance(term, TNatLiteral) and (self.n == term.n))
+    def _type(self):
+        return TNat()
+
+def natLiterals(args):
+    '''The ints of args if all of them reduce to literals, otherwise None.'''
+    r = []
+    for a in args:
+        a = a.normalizeLazily()
+        if not isinstance(a, TNatLiteral):
+            return None
+        r.append(a.n)
+    return r
+
+natToNat = TProduct('', TNat(), TNat())
+natToNatToNat = TProduct('', TNat(), natToNat)
+# Comparisons return Church booleans (T : type[0]) -> T -> T -> T
+natBool = TProduct('T', TUniverse(0), TProduct('', TBoundVariable('T', TUniverse(0), 1), TProduct('', TBoundVariable('T', TUniverse(0), 2), TBoundVariable('T', TUniverse(0), 3))))
+natTrue = TLambda('T', TUniverse(0), TLambda('t', TBoundVariable('T', TUniverse(0), 1), TLambda('f', TBoundVariable('T', TUniverse(0), 2), TBoundVariable('t', TBoundVariable('T', TUniverse(0), 3), 2))))
+natFalse = TLambda('T', TUniverse(0), TLambda('t', TBoundVariable('T', TUniverse(0), 1), TLambda('f', TBoundVariable('T', TUniverse(0), 2), TBoundVariable('f', TBoundVariable('T', TUniverse(0), 3), 1))))
+
+class TNatOperation(TPrimitive):
+    '''A primitive operation reducing on literal arguments.
+    Concrete operations define arity, their type and _compute(ns), ns being the ints of the arguments.'''
+    def _reduce(self, args):
+        ns = natLiterals(args)
+        if ns == None:
+            return None
+        return self._compute(ns)
+
+class TNatSucc(TNatOperation):
+    name = 'succ'
+    arity = 1
+    def _type(self):
+        return natToNat
+    def _compute(self, ns):
+        return TNatLiteral(ns[0] + 1)
+
+class TNatPred(TNatOperation):
+    name = 'pred'
+    arity = 1
+    def _type(self):
+        return natToNat
+    def _compute(self, ns):
+        return TNatLiteral(max(ns[0] - 1, 0))
+
+class TNatAdd(TNatOperation):
+    name = 'add'
+    arity = 2
+    def _type(self):
+        return natToNatToNat
+    def _compute(self, ns):
+        return TNatLiteral(ns[0] + ns[1])
+
+class TNatMul(TNatOperation):
+    name = 'mul'
+    arity = 2
+    def _type(self):
+        return natToNatToNat
+    def _compute(self, ns):
+        return TNatLiteral(ns[0] * ns[1])
+
+class TNatComparison(TNatOperation):
+    arity = 2
+    def _type(self):
+        return TProduct('', TNat(), TProduct('', TNat(), natBool))
+    def _compute(self, ns):
+        return natTrue if self._compare(ns[0], ns[1]) else natFalse
+
+class TNatLess(TNatComparison):
+    name = 'lt'
+    def _compare(self, n1, n2):
+        return n1 < n2
+
+class TNatLessEqual(TNatComparison):
+    name = 'le'
+    def _compare(self, n1, n2):
+        return n1 <= n2
+
+class TNatEqual(TNatComparison):
+    name = 'eq'
+    def _compare(self, n1, n2):
+        return n1 == n2
+
+class TNatElim(TPrimitive):
+    '''The dependent eliminator natElim : (P : Nat -> type[0]) -> P 0 -> ((n : Nat) -> P n -> P (succ n)) -> (n : Nat) -> P n.
+    Each step on a literal or a succ application is a single reduction.'''
+    name = 'natElim'
+    arity = 4
+    def _type(self):
+        motive = TProduct('', TNat(), TUniverse(0))
+        def P(n):
+            return TBoundVariable('P', motive, n)
+        n = TBoundVariable('n', TNat(), 1)
+        step = TProduct('n', TNat(), TProduct('', TApplication(P(3), n), TApplication(P(4), TApplication(TNatSucc(), TBoundVariable('n', TNat(), 2)))))
+        return TProduct('P', motive, TProduct('', TApplication(P(1), TNatLiteral(0)), TProduct('', step, TProduct('n', TNat(), TApplication(P(4), n)))))
+    def _reduce(self, args):
+        (P, z, s, n) = args
+        n = n.normalizeLazily()
+        if isinstance(n, TNatLiteral):
+            if n.n == 0:
+                return z
+            m = TNatLiteral(n.n - 1)
+        elif isinstance(n, TApplication) and isinstance(n.term1, TNatSucc):
+            m = n.term2
+        else:
+            return None
+        return TApplication(TApplication(s, m), TApplication(TApplication(TApplication(TApplication(self, P), z), s), m))
+
+def spine(head, args):
+    '''The application of head to args.'''
+    for a in args:
+        head = TApplication(head, a)
+    return head
+
+# Inductive types, declared by the inductive statement (see ttInductive).
+# Their type formers, constructors and eliminators are primitives with one instance per declaration,
+# and saturated constructor applications are stored compactly as TConstructed nodes.
+
+class TDeclaredPrimitive(TPrimitive):
+    '''A primitive of a declaration, equal to itself only.'''
+    def __init__(self, name, type):
+        self.name = name
+        self.declaredType = type
+    def __repr__(self):
+        return self.__class__.__name__ + '(' + repr(self.name) + ')'
+    def _identical(self, term):
+        return self is term
+    def _type(self):
+        return self.declaredType
+
+class TInductive(TDeclaredPrimitive):
+    '''The type former of an inductive type, a function of params uniform parameters.'''
+    def __init__(self, name, type, params):
+        super(TInductive, self).__init__(name, type)
+        self.params = params
+        self.constructors = []
+        self.eliminator = None
+    def _reduce(self, args):
+        return None
+
+class TConstructor(TDeclaredPrimitive):
+    '''The index-th constructor of an inductive type. It takes the parameters of the type followed by its fields,
+    recursive telling for each field whether it belongs to the type itself.'''
+    def __init__(self, inductive, name, type, index, recursive):
+        super(TConstructor, self).__init__(name, type)
+        self.inductive = inductive
+        self.index = index
+        self.recursive = recursive
+        self.arity = inductive.params + len(recursive)
+    def _reduce(self, args):
+        return TConstructed(self, args)
+
+class TEliminator(TDeclaredPrimitive):
+    '''The dependent eliminator of an inductive type. It takes the parameters, the motive, a case per constructor and the target.
+    An iota step applies the case of the target's constructor to its fields and to the eliminations of its recursive fields.'''
+    def __init__(self, inductive, name, type):
+        super(TEliminator, self).__init__(name, type)
+        self.inductive = inductive
+        self.arity = inductive.params + len(inductive.constructors) + 2
+    def _reduce(self, args):
+        target = args[-1].normalizeLazily()
+        if not (isinstance(target, TConstructed) and (target.constructor.inductive is self.inductive)):
+            return None
+        c = target.constructor
+        fields = target.args[self.inductive.params :]
+        r = spine(args[self.inductive.params + 1 + c.index], fields)
+        eliminate = spine(self, args[: -1])
+        for (f, recursive) in zip(fields, c.recursive):
+            if recursive:
+                r = TApplication(r, TApplication(eliminate, f))
+        return r
+
+class TConstructed(Term):
+    '''The saturated application of a constructor to args, the parameters of its type followed by its fields.'''
+    def __init__(self, constructor, args):
+        self.constructor = constructor
+        self.args = tuple(args)
+        self.loose = max([a.loose for a in self.args] + [0])
+    def __repr__(self):
+        return 'TConstructed(' + repr(self.constructor) + ', ' + repr(self.args) + ')'
+    def __str__(self):
+        return str(spine(self.constructor, self.args))
+    def _identical(self, term):
+        return (self is term) or (isinstance(term, TConstructed) and (self.constructor is term.constructor) and
+            all(a1 == a2 for (a1, a2) in zip(self.args, term.args)))
+    def _type(self):
+        return spine(self.constructor, self.args).type()
+    def _normalize(self):
+        return TConstructed(self.constructor, [a.normalize() for a in self.args])
+    def _normalizeLazily(self):
+        return self
+    def _apply(self, sub):
+        return TConstructed(self.constructor, [sub * a for a in self.args])
+    def children(self):
+        return self.args
+
+natPrimitives = (TNat, TNatSucc, TNatPred, TNatAdd, TNatMul, TNatLess, TNatLessEqual, TNatEqual, TNatElim)
+TPrimitive.maxArity = max(p.arity for p in natPrimitives)
+
+def shadowable(var):
+    '''Whether a declaration may take the name of var. The primitives are declared in every Session, so that scripts
+    declaring names of their own, such as add or Nat, still run: the new Variable replaces the primitive.'''
+    return isinstance(var.value, natPrimitives)
+
+def declarePrimitives(context = None):
+    '''Make the primitives available as global Variables.'''
+    for p in natPrimitives:
+        Variable(p.name, type = p()._type(), value = p(), context = context, new = True)
 
+ThreadState.session = Session() # the default Session, which threads start in
@@ -0,0 +1,198 @@
+import ttCore
+from ttCore import *
+
+import ttCompile
+from ttCompile import apply, readBack, VUniverse, VLambda, VProduct, VNeutral
+
+# Type erasure: checked Terms are turned into untyped lambda terms whose variables carry no types.
+# They are evaluated into ttCompile values without any type work and read back into Terms.
+# Soundness doesn't depend on a global mode: a term is fully checked by check() before it is erased,
+# and global definitions are checked once, when they are erased for the first time.
+# Closed applications of definitions share their normal forms through the application memo of ttCore: a statement's
+# normal form is kept there, and an erased application finds those which other statements computed.
+
+def check(term):
+    '''Check a term fully, including the argument of every application, each shared subterm once.
+    Global definitions are checked separately.'''
+    seen = {}
+    def visit(t):
+        if id(t) in seen:
+            return
+        seen[id(t)] = t
+        if isinstance(t, TApplication):
+            visit(t.term1)
+            visit(t.term2)
+            p = t.term1.type().normalizeLazily()
+            if not isinstance(p, TProduct):
+                raise ProductExpectedError(t.term1)
+            if not convertible(p.varType, t.term2.type()):
+                raise TypeMismatchError(t.term2, t.term2.type().normalize(), p.varType.normalize())
+        elif isinstance(t, TAbstraction):
+            visit(t.varType)
+            visit(t.term)
+            if not isinstance(t.varType.type().normalize(), TUniverse):
+                raise TypeExpectedError(t.varType)
+            t.type()
+        elif isinstance(t, TLet):
+            visit(t.varType)
+            visit(t.value)
+            visit(t.term)
+            if not convertible(t.varType, t.value.type()):
+                raise TypeMismatchError(t.value, t.value.type().normalize(), t.varType.normalize())
+        elif isinstance(t, TConstructed):
+            visit(spine(t.constructor, t.args))
+        elif isinstance(t, TSubstitution):
+            visit(t.sub * t.term)
+    visit(term)
+
+class ETerm(object):
+    '''An abstract base class of erased terms. Concrete ETerms implement evaluate(env).'''
+    pass
+
+class EVariable(ETerm):
+    def __init__(self, name, deBruijn):
+        self.name = name
+        self.deBruijn = deBruijn
+    def evaluate(self, env):
+        for _ in range(self.deBruijn - 1):
+            env = env[1]
+        return env[0]
+
+class EGlobalVariable(ETerm):
+    def __init__(self, var):
+        self.var = var
+    def evaluate(self, env):
+        return erasedValue(self.var)
+
+class EConstant(ETerm):
+    '''A closed irreducible term: a universe or a primitive.'''
+    def __init__(self, value):
+        self.value = value
+    def evaluate(self, env):
+        return self.value
+
+class EAbstraction(ETerm):
+    def __init__(self, name, domain, term):
+        '''The domain is only evaluated if the abstraction is read back.'''
+        self.name = name
+        self.domain = domain
+        self.term = term
+    def evaluate(self, env):
+        return self.valueClass(self.name, lambda: self.domain.evaluate(env), lambda value: self.term.evaluate((value, env)))
+
+class ELambda(EAbstraction):
+    valueClass = VLambda
+
+class EProduct(EAbstraction):
+    valueClass = VProduct
+
+class EApplication(ETerm):
+    def __init__(self, term1, term2):
+        self.term1 = term1
+        self.term2 = term2
+    def evaluate(self, env):
+        return apply(self.term1.evaluate(env), self.term2.evaluate(env))
+
+class ESharedApplication(ETerm):
+    '''A closed application of a definition, whose normal form may be in the application memo. The memo is looked up
+    once, the first time the application is evaluated, and the value of a normal form found there is kept.'''
+    def __init__(self, spine, term):
+        self.spine = spine
+        self.term = term
+        self.looked = False
+        self.value = None
+    def evaluate(self, env):
+        if not self.looked:
+            self.looked = True
+            normal = applications.get(*self.spine)
+            if normal != None:
+                self.value = erase(normal).evaluate(None)
+        if self.value != None:
+            return self.value
+        return self.term.evaluate(env)
+
+class ELet(ETerm):
+    def __init__(self, value, term):
+        self.value = value
+        self.term = term
+    def evaluate(self, env):
+        return self.term.evaluate((self.value.evaluate(env), env))
+
+class ESubstitution(ETerm):
+    def __init__(self, term, subs, shift):
+        '''subs lists the erased substitutes of variables 1, 2, ...'''
+        self.term = term
+        self.subs = subs
+        self.shift = shift
+    def evaluate(self, env):
+        r = env
+        for _ in range(self.shift):
+            r = r[1]
+        for s in reversed(self.subs):
+            r = (s.evaluate(env), r)
+        return self.term.evaluate(r)
+
+def erase(term):
+    '''Erase the types of variables in a term, preserving sharing.'''
+    erased = {}
+    def visit(t):
+        try:
+            return erased[id(t)][1]
+        except KeyError:
+            pass
+        if isinstance(t, TBoundVariable):
+            r = EVariable(t.name, t.deBruijn)
+        elif isinstance(t, TGlobalVariable):
+            r = EGlobalVariable(t.var)
+        elif isinstance(t, TUniverse):
+            r = EConstant(VUniverse(t.n))
+        elif isinstance(t, TPrimitive):
+            r = EConstant(VNeutral(t))
+        elif isinstance(t, TLambda):
+            r = ELambda(t.name, visit(t.varType), visit(t.term))
+        elif isinstance(t, TProduct):
+            r = EProduct(t.name, visit(t.varType), visit(t.term))
+        elif isinstance(t, TApplication):
+            r = EApplication(visit(t.term1), visit(t.term2))
+            spine = applications.spine(t)
+            if spine != None:
+                r = ESharedApplication(spine, r)
+        elif isinstance(t, TLet):
+            r = ELet(visit(t.value), visit(t.term))
+        elif isinstance(t, TConstructed):
+            r = EConstant(VNeutral(t.constructor))
+            for a in t.args:
+                r = EApplication(r, visit(a))
+        elif isinstance(t, TSubstitution):
+            sub = t.sub
+            while isinstance(sub, SNormalized):
+                sub = sub.sub
+            r = ESubstitution(visit(t.term), [visit(sub[i + 1]) for i in range(sub.len)], sub.shift)
+        else:
+            raise TypeError('Cannot erase ' + repr(t))
+        erased[id(t)] = (t, r)
+        return r
+    return visit(term)
+
+def checkDefinition(var):
+    '''Check the definition of a global Variable fully, once per Variable.'''
+    if (var.value != None) and not var.__dict__.get('_checked', False):
+        check(var.value)
+        var._checked = True
+
+def erasedValue(var):
+    '''The value of a global Variable. Its definition is checked, erased and evaluated once per Variable.'''
+    try:
+        return var._erasedValue
+    except AttributeError:
+        if var.value != None:
+            checkDefinition(var)
+            var._erasedValue = erase(var.value).evaluate(None)
+        else:
+            var._erasedValue = VNeutral(var)
+        return var._erasedValue
+
+def evaluateErased(term):
+    '''Check a closed term and normalize it without type work.'''
+    check(term)
+    return applications.normalize(term, lambda: readBack(erase(term).evaluate(None), 0))
@@ -33,14 +33,92 @@ class TypeMismatchError(TypeTheoreticError):
     def __str__(self):
         return 'Type mismatch: ' + str(self.term) + ' : ' + str(self.type) + ', expected ' + str(self.expectedType)
 
+class InductiveError(TypeTheoreticError):
+    def __init__(self, name, reason):
+        self.name = name
+        self.reason = reason
+    def __str__(self):
+        return 'Invalid inductive declaration of ' + self.name + ': ' + self.reason
+
+class RedefinitionError(TypeTheoreticError):
+    def __init__(self, name, reason):
+        self.name = name
+        self.reason = reason
+    def __str__(self):
+        return 'Cannot redefine ' + self.name + ': ' + self.reason
+
+class BrokenDefinitionError(TypeTheoreticError):
+    def __init__(self, name, error):
+        '''error is the error which broke the definition when it was rechecked.'''
+        self.name = name
+        self.error = error
+    def __str__(self):
+        return 'Broken definition: ' + self.name + ' (' + str(self.error) + ')'
+
 class RecursionError(TypeTheoreticError):
     def __init__(self, term):
         self.term = term
     def __str__(self):
         return 'Recursion error: ' + str(self.term)
 
+class ResourceLimitError(TypeTheoreticError):
+    def __init__(self, limit, steps, nodes, seconds, partial = None):
+        '''partial is the weak head normal form the aborted computation reached, if it did.'''
+        self.limit = limit
+        self.steps = steps
+        self.nodes = nodes
+        self.seconds = seconds
+        self.partial = partial
+    def __str__(self):
+        r = 'Resource limit exceeded: ' + self.limit + ' (' + str(self.steps) + ' steps, ' + str(self.nodes) + ' nodes, ' + str(round(self.seconds, 2)) + ' sec)'
+        if self.partial != None:
+            r = r + '\nWeak head normal form: ' + self.partial.abbreviation()
+        return r
+
+class OptimalReductionError(TypeTheoreticError):
+    def __init__(self, reason):
+        self.reason = reason
+    def __str__(self):
+        return 'Cannot reduce optimally: ' + self.reason
+
+class UnknownJobError(TypeTheoreticError):
+    def __init__(self, number):
+        self.number = number
+    def __str__(self):
+        return 'Unknown job: ' + str(self.number)
+
+class CancelledError(TypeTheoreticError):
+    def __str__(self):
+        return 'Cancelled'
+
+class PublicationError(TypeTheoreticError):
+    def __init__(self, name, reason):
+        self.name = name
+        self.reason = reason
+    def __str__(self):
+        return 'Cannot publish ' + self.name + ': ' + self.reason
+
+class ForkError(TypeTheoreticError):
+    def __init__(self, reason):
+        self.reason = reason
+    def __str__(self):
+        return 'Cannot fork worker processes: ' + self.reason
+
+class UnknownLimitError(TypeTheoreticError):
+    def __init__(self, name):
+        self.name = name
+    def __str__(self):
+        return 'Unknown limit: ' + self.name
+
 class ParsingError(Exception):
     def __init__(self, token):
         self.token = token
     def __str__(self):
         return 'Parsing error at token ' + self.token.type
+
+class IngestionError(ParsingError):
+    def __init__(self, reason, line = None):
+        self.reason = reason
+        self.line = line
+    def __str__(self):
+        return 'Ingestion error' + (' at line ' + str(self.line) if self.line != None else '') + ': ' + self.reason
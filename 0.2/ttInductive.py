@@ -0,0 +1,128 @@
+import ttCore
+from ttCore import *
+
+import ttCompile
+from ttCompile import apply, closedValue, readBack, VNeutral, VProduct, VUniverse
+
+# Declarations of inductive types with uniform parameters:
+#     I : (p1 : P1) -> ... -> (pk : Pk) -> type[u]
+#     c : (p1 : P1) -> ... -> (pk : Pk) -> (f1 : F1) -> ... -> (fm : Fm) -> I p1 ... pk
+# Constructors repeat the parameters of the type. A field is either recursive, of type I p1 ... pk exactly,
+# or doesn't mention I at all. The eliminator, named after the type, is
+#     iElim : (p1 : P1) -> ... -> (pk : Pk) -> (P : I p1 ... pk -> type[u]) -> (cCase : ...) ... -> (x : I p1 ... pk) -> P x
+# where the case of c takes the fields and a value of P for each recursive field, and returns P (c p1 ... pk f1 ... fm).
+
+def declareInductive(name, type, constructors, context = None):
+    '''Declare an inductive type, its constructors and its eliminator as global Variables, and return their names.
+    constructors is a list of (name, translate) pairs, translate() returning the type of the constructor.
+    Constructor types are translated once the type itself is declared, so that they can refer to it.
+    The context defaults to the one of the active Session.'''
+    if context is None:
+        context = session().context
+    _universe(type)
+    (params, u) = _params(name, type.normalize())
+    inductive = TInductive(name, type, len(params))
+    declared = [] # the new Variables and those they shadow, if any
+    def declare(name, type, value):
+        previous = context.get(name)
+        declared.append((Variable(name, type = type, value = value, context = context, new = True), previous))
+    declare(name, type, inductive)
+    try:
+        for (index, (cname, translate)) in enumerate(constructors):
+            ctype = translate()
+            _universe(ctype)
+            c = TConstructor(inductive, cname, ctype, index, _fields(inductive, params, cname, ctype.normalize()))
+            inductive.constructors.append(c)
+            declare(cname, ctype, c if c.arity != 0 else TConstructed(c, ()))
+        ename = eliminatorName(name)
+        inductive.eliminator = TEliminator(inductive, ename, _eliminatorType(inductive, u))
+        declare(ename, inductive.eliminator.declaredType, inductive.eliminator)
+    except:
+        for (var, previous) in reversed(declared):
+            undeclare(var, previous, context)
+        raise
+    TPrimitive.maxArity = max([TPrimitive.maxArity, inductive.eliminator.arity] + [c.arity for c in inductive.constructors])
+    return [var.name for (var, previous) in declared]
+
+def eliminatorName(name):
+    return name[0].lower() + name[1 :] + 'Elim'
+
+def _universe(type):
+    u = type.type().normalize()
+    if not isinstance(u, TUniverse):
+        raise TypeExpectedError(type)
+    return u.n
+
+def _params(name, type):
+    '''The parameter types of a normal type former and its universe.'''
+    params = []
+    while isinstance(type, TProduct):
+        params.append(type.varType)
+        type = type.term
+    if not isinstance(type, TUniverse):
+        raise InductiveError(name, 'its type must end in a universe')
+    return (params, type.n)
+
+def _family(inductive, depth):
+    '''I p1 ... pk, the parameters being bound depth binders further out than the last of them.'''
+    k = inductive.params
+    return spine(inductive, [TBoundVariable('', None, k - i + depth) for i in range(k)])
+
+def _occurs(term, inductive):
+    '''Whether a normal term mentions the inductive type, types of bound variables aside.'''
+    stack = [term]
+    while stack:
+        t = stack.pop()
+        if t is inductive:
+            return True
+        if not isinstance(t, TBoundVariable):
+            stack.extend(t.children())
+    return False
+
+def _fields(inductive, params, cname, ctype):
+    '''Check the normal type of a constructor and tell for each of its fields whether it is recursive.'''
+    for p in params:
+        if not (isinstance(ctype, TProduct) and (ctype.varType == p)):
+            raise InductiveError(inductive.name, cname + ' must take the parameters of the type first')
+        ctype = ctype.term
+    recursive = []
+    while isinstance(ctype, TProduct):
+        if ctype.varType == _family(inductive, len(recursive)):
+            recursive.append(True)
+        elif _occurs(ctype.varType, inductive):
+            raise InductiveError(inductive.name, 'the fields of ' + cname + ' must be of the type itself or not mention it')
+        else:
+            recursive.append(False)
+        ctype = ctype.term
+    if ctype != _family(inductive, len(recursive)):
+        raise InductiveError(inductive.name, cname + ' must construct the type applied to its parameters')
+    return recursive
+
+def _eliminatorType(inductive, u):
+    '''The type of the eliminator, built as a value and read back, so that ttCompile takes care of the indices.'''
+    def params(v, ps):
+        if len(ps) < inductive.params:
+            return VProduct(v.name if v.name != '' else 'p', v.domain, lambda p: params(v.body(p), ps + [p]))
+        family = VNeutral(inductive, tuple(ps))
+        return VProduct('P', lambda: VProduct('', lambda: family, lambda x: VUniverse(u)), lambda P: cases(family, ps, P, 0))
+    def cases(family, ps, P, index):
+        if index < len(inductive.constructors):
+            c = inductive.constructors[index]
+            return VProduct(c.name + 'Case', lambda: caseType(c, ps, P), lambda case: cases(family, ps, P, index + 1))
+        return VProduct('x', lambda: family, lambda x: apply(P, x))
+    def caseType(c, ps, P):
+        v = closedValue(c.declaredType)
+        for p in ps:
+            v = v.body(p)
+        return fields(c, v, ps, P, [])
+    def fields(c, v, ps, P, fs):
+        if len(fs) < len(c.recursive):
+            return VProduct(v.name if v.name != '' else 'f', v.domain, lambda f: fields(c, v.body(f), ps, P, fs + [f]))
+        return hypotheses(c, ps, P, fs, 0)
+    def hypotheses(c, ps, P, fs, i):
+        while (i < len(fs)) and not c.recursive[i]:
+            i = i + 1
+        if i < len(fs):
+            return VProduct('', lambda: apply(P, fs[i]), lambda h: hypotheses(c, ps, P, fs, i + 1))
+        return apply(P, VNeutral(c, tuple(ps + fs)))
+    return readBack(params(closedValue(inductive.declaredType), []), 0)
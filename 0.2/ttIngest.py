@@ -0,0 +1,113 @@
+import ttCore
+from ttCore import *
+
+import ttErasure
+import ttErrors
+import ttParser
+import ttSerialize
+
+import json
+
+# A machine-readable statement format for tools generating terms, loaded without tokenizing, parsing or
+# resolving names again. A file holds one statement per line, as a JSON array:
+#     ["parameter", name, type]
+#     ["definition", name, type or null, value]
+#     ["check", term]
+#     ["evaluate", term]
+# where terms are the node lists of ttSerialize: de Bruijn indexed nodes referring to their subterms by position,
+# so that shared subterms are written once. Files are read and executed a line at a time.
+# Nothing of a line is trusted: its terms are rebound by ttSerialize, and its declarations are checked by the kernel
+# before they are registered, unless in unsafe mode.
+
+def statement(line):
+    '''The Statement of a line, None for a blank one.'''
+    if line.strip() == '':
+        return None
+    try:
+        s = json.loads(line)
+        kind = s[0]
+        if kind == 'parameter':
+            return SIngested(ttParser.SParameter(s[1], term(s[2])))
+        elif kind == 'definition':
+            if s[2] == None:
+                return SIngested(ttParser.SDefinition(s[1], term(s[3])))
+            return SIngested(ttParser.STypedDefinition(s[1], term(s[2]), term(s[3])))
+        elif kind == 'check':
+            return ttParser.SCheck(term(s[1]))
+        elif kind == 'evaluate':
+            return ttParser.SEvaluate(term(s[1]))
+    except (ttErrors.ParsingError, ttErrors.TypeTheoreticError):
+        raise
+    except Exception as e:
+        # Whatever else a malformed line breaks is its fault too
+        raise ttErrors.IngestionError(str(e))
+    raise ttErrors.IngestionError('unknown statement ' + repr(kind))
+
+def term(nodes):
+    try:
+        t = ttSerialize.decode(nodes)
+        if not isinstance(t, Term):
+            raise ttErrors.IngestionError('a substitution where a term is expected')
+        return ttSerialize.rebind(t)
+    except (ttErrors.ParsingError, ttErrors.TypeTheoreticError):
+        raise
+    except Exception as e:
+        raise ttErrors.IngestionError(str(e))
+
+def checkType(type):
+    ttErasure.check(type)
+    if not isinstance(type.type().normalize(), TUniverse):
+        raise TypeExpectedError(type)
+
+class SIngested(object):
+    '''A declaration of a line, which the kernel checks before it is registered, unless in unsafe mode.'''
+    def __init__(self, statement):
+        self.statement = statement
+    def execute(self):
+        s = self.statement
+        unsafe = session().unsafeMode
+        if unsafe:
+            return s.execute()
+        if isinstance(s, ttParser.SParameter):
+            checkType(s.term)
+            return s.execute()
+        if isinstance(s, ttParser.STypedDefinition):
+            checkType(s.type)
+        ttErasure.check(s.term)
+        if isinstance(s, ttParser.STypedDefinition) and not convertible(s.term.type(), s.type):
+            raise TypeMismatchError(s.term, s.term.type().normalize(), s.type.normalize())
+        r = s.execute()
+        r.var._checked = True
+        return r
+
+def statements(lines):
+    '''The Statements of lines, an iterable such as a file, one at a time.'''
+    for (n, line) in enumerate(lines):
+        try:
+            s = statement(line)
+        except ttErrors.IngestionError as e:
+            e.line = n + 1
+            raise
+        if s != None:
+            yield s
+
+def ingest(path):
+    '''Execute the statements of a file and return their results.'''
+    with open(path) as f:
+        return [s.execute() for s in statements(f)]
+
+def export(statement):
+    '''The line of a ttParser Statement, the inverse of statement().'''
+    if isinstance(statement, ttParser.SParameter):
+        s = ['parameter', statement.name, ttSerialize.encode(statement.term)]
+    elif isinstance(statement, ttParser.SDefinition):
+        s = ['definition', statement.name, None, ttSerialize.encode(statement.term)]
+    elif isinstance(statement, ttParser.STypedDefinition):
+        s = ['definition', statement.name, ttSerialize.encode(statement.type), ttSerialize.encode(statement.term)]
+    elif isinstance(statement, ttParser.SCheck):
+        s = ['check', ttSerialize.encode(statement.term)]
+    elif isinstance(statement, ttParser.SEvaluate):
+        s = ['evaluate', ttSerialize.encode(statement.term)]
+    else:
+        raise TypeError('Cannot export ' + repr(statement))
+    return json.dumps(s, separators = (',', ':'))
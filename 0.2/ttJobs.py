@@ -0,0 +1,90 @@
+import ttCore
+from ttCore import *
+
+import ttStream
+
+import itertools
+import threading
+
+# Background jobs of the REPL. A statement followed by & runs in a worker thread, in a fork of the Session which
+# shares its context, so that the mode and the limits the statement sets are its own, and the REPL goes on with
+# the next statements meanwhile. A job runs within a Budget through which it is cancelled: the statement raises
+# CancelledError at its next step, and since a new Variable is registered only once everything about it has been
+# computed, a cancelled definition leaves nothing behind.
+# Finished jobs are reported once, by the REPL before its next prompt or by waiting for them.
+
+class Job(object):
+    def __init__(self, number, source, statement, session, stackSize = 512 * 1024 * 1024):
+        self.number = number
+        self.source = source
+        self.statement = statement
+        self.session = session.fork()
+        self.budget = Budget()
+        self.state = 'running'
+        self.result = None # the result of the statement or the error it raised
+        self.done = threading.Event()
+        # The stack size is read when the thread starts
+        oldStackSize = threading.stack_size(stackSize)
+        try:
+            self.thread = threading.Thread(target = self.run, daemon = True)
+            self.thread.start()
+        finally:
+            threading.stack_size(oldStackSize)
+    def run(self):
+        try:
+            self.result = runIn(self.session, lambda: runWithin(self.budget, self.execute))
+            self.state = 'done'
+        except CancelledError:
+            self.state = 'cancelled'
+        except Exception as e:
+            self.result = e
+            self.state = 'failed'
+        finally:
+            if self.state == 'running':
+                self.state = 'failed'
+            self.done.set()
+    def execute(self):
+        # A Stream is computed as it is printed, which has to happen here, within the Budget of the job
+        return ttStream.force(self.statement.execute())
+    def cancel(self):
+        self.budget.cancel()
+    def __str__(self):
+        return '[' + str(self.number) + '] ' + self.state + ' ' + self.source
+    def outcome(self):
+        return str(self) + ('\n' + str(self.result) if self.result != None else '')
+
+class Jobs(object):
+    '''The jobs of a Session which haven't been reported yet, by number.'''
+    def __init__(self):
+        self.jobs = {}
+        self.numbers = itertools.count(1)
+    def start(self, source, statement):
+        job = Job(next(self.numbers), source, statement, session())
+        self.jobs[job.number] = job
+        return job
+    def get(self, number):
+        try:
+            return self.jobs[number]
+        except KeyError:
+            raise UnknownJobError(number)
+    def report(self, job):
+        del self.jobs[job.number]
+        return job.outcome()
+    def finished(self):
+        '''Report the jobs which have finished.'''
+        return [self.report(job) for job in list(self.jobs.values()) if job.done.is_set()]
+    def wait(self, number = None):
+        '''Wait for a job, or for all of them if number is None, and report it.'''
+        jobs = [self.get(number)] if number != None else list(self.jobs.values())
+        for job in jobs:
+            job.done.wait()
+        return [self.report(job) for job in jobs]
+    def __str__(self):
+        return '\n'.join(str(job) for job in self.jobs.values())
+
+def jobs():
+    '''The Jobs of the active Session.'''
+    s = session()
+    if s.jobs == None:
+        s.jobs = Jobs()
+    return s.jobs
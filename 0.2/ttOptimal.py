@@ -0,0 +1,228 @@
+import ttCore
+from ttCore import *
+
+import ttErasure
+
+import itertools
+
+# Optimal reduction, experimental. A closed, checked term is translated into an interaction net: lambdas, products
+# and applications become nodes, and every variable used more than once is shared by a tree of fans. The net is
+# reduced by local interactions, beta on a lambda meeting an application and fans duplicating whatever they meet
+# one node at a time, so that a redex is never copied before it is reduced: shared work under lambdas stays shared,
+# unlike with substitution or call-by-need. The normal form is read back into Terms.
+# This is the abstract algorithm of Lamping and Gonthier, Abadi and Levy without the oracle of brackets: fans carry
+# labels, two fans annihilate if their labels agree and duplicate each other otherwise. Definitions are unfolded
+# where they are used, so that the fans of each use have labels of their own. Still, without the oracle, the nets
+# of terms whose duplications interfere, beyond the terms typable in elementary affine logic, may be read back
+# wrongly or not at all. Types are carried along as products and domains. Nat operations and eliminators have no
+# interaction rules, and aren't supported.
+
+# Node kinds, and the auxiliary ports of each. Port 0 is the principal one. Binders have their body on port 1,
+# their variable on port 2 and their domain on port 3, applications their argument on port 1 and result on port 2.
+ROOT, LAMBDA, APPLICATION, PRODUCT, FAN, ERASER, ATOM = range(7)
+auxiliary = ((), (1, 2, 3), (1, 2), (1, 2, 3), (1, 2), (), ())
+
+class Node(object):
+    __slots__ = ('kind', 'info', 'ports')
+    def __init__(self, kind, info = None):
+        self.kind = kind
+        self.info = info # the name of a binder, the label of a fan or the closed Term of an atom
+        self.ports = [None] * (len(auxiliary[kind]) + 1)
+
+def interacts(a, b):
+    if (a.kind == ROOT) or (b.kind == ROOT):
+        return False
+    if (a.kind in (FAN, ERASER)) or (b.kind in (FAN, ERASER)):
+        return True
+    return {a.kind, b.kind} == {LAMBDA, APPLICATION}
+
+class Net(object):
+    '''An interaction net with the output of its term on the only port of its root.'''
+    def __init__(self):
+        self.redexes = []
+        self.labels = itertools.count()
+        self.nodes = 0
+        self.interactions = 0
+        self.root = self.node(ROOT)
+    def node(self, kind, info = None):
+        self.nodes += 1
+        return Node(kind, info)
+    def link(self, p, q):
+        (a, i) = p
+        (b, j) = q
+        a.ports[i] = q
+        b.ports[j] = p
+        if (i == 0) and (j == 0) and interacts(a, b):
+            self.redexes.append((a, b))
+    def share(self, ports):
+        '''A port whose value reaches all of ports, through a tree of fans.'''
+        if not ports:
+            return (self.node(ERASER), 0)
+        r = ports[-1]
+        for p in reversed(ports[: -1]):
+            f = self.node(FAN, next(self.labels))
+            self.link((f, 1), p)
+            self.link((f, 2), r)
+            r = (f, 0)
+        return r
+    # Each rule links the new ports to the current targets of the old ones, one at a time, so that wires between
+    # the ports of the active pair itself are followed to their other end
+    def reduce(self):
+        budget = active.budget
+        while self.redexes:
+            (a, b) = self.redexes.pop()
+            if budget is not None:
+                budget.step()
+            self.interactions += 1
+            if a.kind > b.kind:
+                (a, b) = (b, a)
+            if b.kind == ERASER:
+                self.erase(a)
+            elif a.kind == ERASER:
+                pass
+            elif (a.kind == FAN) and (b.kind == FAN) and (a.info == b.info):
+                self.annihilate(a, b)
+            elif b.kind == FAN:
+                self.commute(b, a)
+            elif a.kind == FAN:
+                self.commute(a, b)
+            else:
+                self.beta(a, b)
+    def beta(self, l, a):
+        self.link(l.ports[1], a.ports[2])
+        self.link(l.ports[2], a.ports[1])
+        self.link(l.ports[3], (self.node(ERASER), 0))
+    def annihilate(self, f1, f2):
+        self.link(f1.ports[1], f2.ports[1])
+        self.link(f1.ports[2], f2.ports[2])
+    def commute(self, f, x):
+        '''Duplicate x by the fan f, and f by x: each copy of x gets a copy of f on its every auxiliary port.'''
+        copies = [self.node(x.kind, x.info) for _ in (1, 2)]
+        fans = [self.node(f.kind, f.info) for _ in auxiliary[x.kind]]
+        for (i, c) in enumerate(copies):
+            self.link((c, 0), f.ports[i + 1])
+        for (j, s) in enumerate(auxiliary[x.kind]):
+            self.link((fans[j], 0), x.ports[s])
+            for (i, c) in enumerate(copies):
+                self.link((c, s), (fans[j], i + 1))
+    def erase(self, x):
+        for s in auxiliary[x.kind]:
+            self.link((self.node(ERASER), 0), x.ports[s])
+    def readBack(self):
+        return self.read(self.root.ports[0], 0, {}, {})
+    def read(self, port, depth, stacks, levels):
+        '''The Term at port, read under depth binders. Fans are crossed by the paths of the term: entering one by
+        an auxiliary port pushes it on the stack of its label, and entering one by its principal port pops it.
+        levels maps the binders being read to their depth and domain.'''
+        budget = active.budget
+        if budget is not None:
+            budget.allocate()
+        (n, i) = port
+        if n.kind == FAN:
+            stacks = dict(stacks)
+            if i != 0:
+                stacks[n.info] = (i, stacks.get(n.info))
+                return self.read(n.ports[0], depth, stacks, levels)
+            if stacks.get(n.info) == None:
+                raise OptimalReductionError('the net of the normal form cannot be read back without an oracle')
+            (i, stacks[n.info]) = stacks[n.info]
+            return self.read(n.ports[i], depth, stacks, levels)
+        elif (n.kind in (LAMBDA, PRODUCT)) and (i == 0):
+            domain = self.read(n.ports[3], depth, stacks, levels)
+            outer = levels.get(n)
+            levels[n] = (depth, domain)
+            try:
+                body = self.read(n.ports[1], depth + 1, stacks, levels)
+            finally:
+                levels[n] = outer
+            return (TLambda if n.kind == LAMBDA else TProduct)(n.info, domain, body)
+        elif (n.kind in (LAMBDA, PRODUCT)) and (i == 2) and (levels.get(n) != None):
+            (level, domain) = levels[n]
+            return TBoundVariable(n.info, TSubstitution(domain, Substitution(subs = [], shift = depth - level)), depth - level)
+        elif (n.kind == APPLICATION) and (i == 2):
+            r = TApplication(self.read(n.ports[0], depth, stacks, levels), self.read(n.ports[1], depth, stacks, levels))
+            (head, args) = unspine(r)
+            if isinstance(head, TConstructor) and (len(args) == head.arity):
+                return TConstructed(head, args)
+            return r
+        elif n.kind == ATOM:
+            if isinstance(n.info, TConstructor) and (n.info.arity == 0):
+                return TConstructed(n.info, [])
+            return n.info
+        raise OptimalReductionError('the net of the normal form is malformed')
+
+def unspine(term):
+    '''The head of a spine of applications and its arguments.'''
+    args = []
+    while isinstance(term, TApplication):
+        args.append(term.term2)
+        term = term.term1
+    args.reverse()
+    return (term, args)
+
+class Binder(object):
+    '''A variable being translated: the ports its value is to be linked to.'''
+    def __init__(self):
+        self.uses = []
+
+def translate(term):
+    '''The net of a closed term.'''
+    net = Net()
+    def visit(t, env, dest):
+        if isinstance(t, TBoundVariable):
+            for _ in range(t.deBruijn - 1):
+                env = env[1]
+            env[0].uses.append(dest)
+        elif isinstance(t, TGlobalVariable):
+            if t.var.value == None:
+                net.link(dest, (net.node(ATOM, t), 0))
+            else:
+                ttErasure.checkDefinition(t.var)
+                visit(t.var.value, None, dest)
+        elif isinstance(t, TAbstraction):
+            n = net.node(LAMBDA if isinstance(t, TLambda) else PRODUCT, t.name)
+            net.link(dest, (n, 0))
+            visit(t.varType, env, (n, 3))
+            b = Binder()
+            visit(t.term, (b, env), (n, 1))
+            net.link((n, 2), net.share(b.uses))
+        elif isinstance(t, TApplication):
+            n = net.node(APPLICATION)
+            net.link(dest, (n, 2))
+            visit(t.term1, env, (n, 0))
+            visit(t.term2, env, (n, 1))
+        elif isinstance(t, TLet):
+            b = Binder()
+            visit(t.term, (b, env), dest)
+            if b.uses:
+                visit(t.value, env, net.share(b.uses))
+        elif isinstance(t, TSubstitution):
+            sub = t.sub
+            while isinstance(sub, SNormalized):
+                sub = sub.sub
+            inner = env
+            for _ in range(sub.shift):
+                inner = inner[1]
+            binders = [Binder() for _ in range(sub.len)]
+            for b in reversed(binders):
+                inner = (b, inner)
+            visit(t.term, inner, dest)
+            for (i, b) in enumerate(binders):
+                if b.uses:
+                    visit(sub[i + 1], env, net.share(b.uses))
+        elif isinstance(t, TConstructed):
+            visit(spine(t.constructor, t.args), env, dest)
+        elif isinstance(t, (TNatOperation, TNatElim, TEliminator)):
+            raise OptimalReductionError(str(t) + ' has no interaction rules')
+        elif isinstance(t, (TUniverse, TPrimitive)):
+            net.link(dest, (net.node(ATOM, t), 0))
+        else:
+            raise TypeError('Cannot translate ' + repr(t))
+    visit(term, None, (net.root, 0))
+    return net
+
+def evaluateOptimally(term):
+    '''Normalize a closed, checked term by optimal reduction.'''
+    net = translate(term)
+    net.reduce()
+    return net.readBack()
@@ -0,0 +1,93 @@
+import ttCore
+from ttCore import *
+
+import ttErrors
+import ttSerialize
+
+import multiprocessing
+import threading
+
+# Parallel normalization. The parts of a weak head normal form, the arguments of a stuck application
+# or the domain and body of an abstraction, are normalized independently of each other.
+# Where at least two of them are large, each large one is shipped to a worker process, serialized by ttSerialize.
+# Workers are forked per normalization, so they see the active Session as it is when it starts. A fork copies the
+# locks of the process but only the forking thread, so pools are forked only while no other thread is alive, which
+# could hold the lock of the Session or of a memo store and leave it held in the workers forever. While others run,
+# as in a background job or beside a speculator, normalization and batches run in this process alone instead.
+
+threshold = 200 # the size from which a subterm is worth a worker
+
+def size(term, limit):
+    '''The number of distinct nodes of a term and of the definitions of the globals it refers to, counted up to limit.'''
+    seen = set()
+    stack = [term]
+    while stack and (len(seen) < limit):
+        t = stack.pop()
+        if id(t) in seen:
+            continue
+        seen.add(id(t))
+        stack.extend(t.children())
+        if isinstance(t, TGlobalVariable) and (t.var.value != None):
+            stack.append(t.var.value)
+    return len(seen)
+
+def normalizeEncoded(nodes):
+    '''The worker's job.'''
+    return ttSerialize.encode(ttSerialize.decode(nodes).normalize())
+
+def forkable():
+    '''Whether pools can be forked: no other thread is running.'''
+    return threading.active_count() == 1
+
+def forkPool(processes, initializer = None, initargs = ()):
+    '''A pool of processes forked from this one, which is expected to run no other thread.
+    Each worker calls initializer(*initargs) first, if given.'''
+    if not forkable():
+        others = threading.active_count() - 1
+        raise ttErrors.ForkError(str(others) + ' other thread' + ('s are' if others > 1 else ' is') +
+            ' running; stop speculating and wait for the jobs first')
+    return multiprocessing.get_context('fork').Pool(processes, initializer, initargs)
+
+def parallelNormalize(term, processes = None):
+    '''Normalize a term, using a pool of processes, one per CPU by default, or in this process if none can be forked.'''
+    if not forkable():
+        return term.normalize()
+    with forkPool(processes) as pool:
+        def ship(t):
+            job = pool.apply_async(normalizeEncoded, (ttSerialize.encode(t),))
+            return lambda: ttSerialize.decode(job.get())
+        def split(t):
+            '''Ship the large parts of t and return a function computing the normal form of t.
+            Small parts are normalized locally, once all jobs have been shipped and before waiting for any.'''
+            w = t.normalizeLazily()
+            if isinstance(w, TAbstraction):
+                parts = [w.varType, w.term]
+            elif isinstance(w, TApplication):
+                parts = []
+                h = w
+                while isinstance(h, TApplication):
+                    parts.append(h.term2)
+                    h = h.term1
+                parts.append(h)
+                parts.reverse()
+            else:
+                return w.normalize
+            large = [size(p, threshold) >= threshold for p in parts]
+            if sum(large) == 1:
+                parts = [split(p) if l else p.normalize for (p, l) in zip(parts, large)]
+            elif sum(large) > 1:
+                parts = [ship(p) if l else p.normalize for (p, l) in zip(parts, large)]
+            else:
+                return w.normalize
+            def rebuild():
+                normal = [None] * len(parts)
+                for i in sorted(range(len(parts)), key = lambda i: large[i]):
+                    normal[i] = parts[i]()
+                if isinstance(w, TAbstraction):
+                    return w.__class__(w.name, normal[0], normal[1])
+                r = normal[0]
+                for p in normal[1:]:
+                    r = TApplication(r, p)
+                return r
+            return rebuild
+        return split(term)()
@@ -1,3 +1,4 @@
+import re
 import sys
 
 import ttCore
@@ -6,6 +7,21 @@ from ttCore import *
 import ttParsingStage
 from ttParsingStage import *
 
+import ttBatch
+import ttCompile
+import ttErasure
+import ttIngest
+import ttInductive
+import ttJobs
+import ttOptimal
+import ttParallel
+import ttRedefine
+import ttSearch
+import ttShared
+import ttSpeculate
+import ttStream
+import ttTrace
+
 import ttErrors
 
 import ply.lex as lex
@@ -15,7 +31,25 @@ import time
 from time import clock
 
 class Statement(object):
-    pass
+    def bounded(self, f, partial, steps = None):
+        '''Call f() within the default limits, steps replacing the default step limit if given.
+        If a limit is exceeded, the error carries partial(), the weak head normal form, if it was reached: it is computed
+        first within the same limits, since normalizing starts with it anyway, rather than again once they are exceeded.'''
+        limits = dict(session().limits)
+        if steps != None:
+            limits['steps'] = steps
+        if all(l == None for l in limits.values()):
+            return f()
+        reached = []
+        def run():
+            reached.append(partial())
+            return f()
+        try:
+            return runWithin(Budget(**limits), run)
+        except ttErrors.ResourceLimitError as e:
+            if reached:
+                e.partial = reached[0]
+            raise
 
 class SParameter(Statement):
     def __init__(self, name, term):
@@ -29,7 +63,10 @@ class SDefinition(Statement):
         self.name = name
         self.term = term
     def execute(self):
-        return TGlobalVariable(Variable(self.name, type = self.term.type(), value = self.term, new = True))
+        var = Variable(self.name, type = self.term.type(), value = self.term, new = True)
+        var.inferred = True
+        ttSpeculate.speculate(var)
+        return TGlobalVariable(var)
 
 class STypedDefinition(Statement):
     # Should we check?
@@ -38,19 +75,115 @@ class STypedDefinition(Statement):
         self.type = type
         self.term = term
     def execute(self):
-        return TGlobalVariable(Variable(self.name, type = self.type, value = self.term, new = True))
+        var = Variable(self.name, type = self.type, value = self.term, new = True)
+        ttSpeculate.speculate(var)
+        return TGlobalVariable(var)
+
+class SRedefine(Statement):
+    def __init__(self, name, type, term):
+        '''type is None if it is to be inferred.'''
+        self.name = name
+        self.type = type
+        self.term = term
+    def execute(self):
+        (dependents, broken) = ttRedefine.redefine(self.name, self.type, self.term)
+        r = 'Redefined ' + self.name
+        if dependents:
+            r = r + '\nRechecked: ' + ' '.join(d.name for d in dependents)
+        for (name, error) in broken:
+            r = r + '\nBroken: ' + name + ': ' + str(error)
+        return r
+
+class SInductive(Statement):
+    def __init__(self, name, type, constructors):
+        '''type and the types of the constructors, a list of (name, type) pairs, are untranslated PTerms,
+        since the constructor types can only be translated once the type is declared.'''
+        self.name = name
+        self.type = type
+        self.constructors = constructors
+    def execute(self):
+        return ' '.join(ttInductive.declareInductive(self.name, self.type.Translate(), [(name, type.Translate) for (name, type) in self.constructors]))
 
 class SCheck(Statement):
-    def __init__(self, term):
+    def __init__(self, term, steps = None):
         self.term = term
+        self.steps = steps
     def execute(self):
-        return self.term.type().normalize()
+        return self.bounded(lambda: self.term.type().normalize(), lambda: self.term.type().normalizeLazily(), self.steps)
 
 class SEvaluate(Statement):
+    def __init__(self, term, steps = None):
+        self.term = term
+        self.steps = steps
+    def execute(self):
+        return self.bounded(self.evaluate, self.term.normalizeLazily, self.steps)
+    def evaluate(self):
+        if session().unsafeMode:
+            return self.term.normalize()
+        # The term is checked once and then evaluated with its types erased
+        return ttErasure.evaluateErased(self.term)
+
+class SCompiledEvaluate(Statement):
+    def __init__(self, term, steps = None):
+        self.term = term
+        self.steps = steps
+    def execute(self):
+        return self.bounded(self.evaluate, self.term.normalizeLazily, self.steps)
+    def evaluate(self):
+        # Compiled code doesn't check types, so the term is checked first unless we are unsafe anyway
+        if not session().unsafeMode:
+            ttErasure.check(self.term)
+        return ttCompile.evaluateCompiled(self.term)
+
+class SOptimalEvaluate(Statement):
     def __init__(self, term):
         self.term = term
     def execute(self):
-        return self.term.normalize()
+        return self.bounded(self.evaluate, self.term.normalizeLazily)
+    def evaluate(self):
+        # As for compiled evaluate, the term is checked first unless we are unsafe anyway
+        if not session().unsafeMode:
+            ttErasure.check(self.term)
+        return ttOptimal.evaluateOptimally(self.term)
+
+class SLazyEvaluate(Statement):
+    def __init__(self, term, steps = None):
+        '''Evaluate term into a Stream, whose normal form is computed as it is printed, within limits which apply to
+        the whole printing.'''
+        self.term = term
+        self.steps = steps
+    def execute(self):
+        limits = dict(session().limits)
+        if self.steps != None:
+            limits['steps'] = self.steps
+        if not session().unsafeMode:
+            runWithin(Budget(**limits), lambda: ttErasure.check(self.term))
+        return ttStream.Stream(self.term, limits)
+
+class SParallelEvaluate(Statement):
+    def __init__(self, term):
+        self.term = term
+    def execute(self):
+        # As for evaluate, the term is checked once, and then normalized without type work by all processes
+        unsafe = session().unsafeMode
+        if not unsafe:
+            ttErasure.check(self.term)
+        setUnsafeMode(True)
+        try:
+            return ttParallel.parallelNormalize(self.term)
+        finally:
+            setUnsafeMode(unsafe)
+
+class SMap(Statement):
+    def __init__(self, function, path, processes = 1):
+        '''Evaluate function applied to each input of the file path, in processes worker processes,
+        one per CPU if it is None.'''
+        self.function = function
+        self.path = path
+        self.processes = processes
+    def execute(self):
+        # The results are computed as they are printed, so that the first ones show up before the whole batch is done
+        return ttBatch.Results(self.function, self.path, self.processes, session().limits)
 
 class SExpression(Statement):
     def __init__(self, term):
@@ -58,10 +191,84 @@ class SExpression(Statement):
     def execute(self):
         return self.term
 
+class SStats(Statement):
+    def __init__(self, term = None):
+        '''Show the statistics of term and of its normal form, or those of the memo stores if term is None.'''
+        self.term = term
+    def execute(self):
+        if self.term == None:
+            return '\n'.join(name + ': ' + ', '.join(k + ' ' + str(v) for (k, v) in sorted(store.statistics().items()))
+                for (name, store) in [('Memo', memo), ('Applications', applications)])
+        return 'Term: ' + str(TermStatistics(self.term)) + '\nNormal form: ' + str(TermStatistics(self.term.normalize()))
+
+class SLimit(Statement):
+    def __init__(self, name = None, n = None):
+        '''Set the default limit name to n, 0 meaning unlimited, or show the limits if name is None.'''
+        self.name = name
+        self.n = n
+    def execute(self):
+        limits = session().limits
+        if self.name == None:
+            return ', '.join(name + ' ' + str(l if l != None else 0) for (name, l) in sorted(limits.items()))
+        if self.name not in limits:
+            raise ttErrors.UnknownLimitError(self.name)
+        limits[self.name] = self.n if self.n != 0 else None
+        return None
+
+class SSpeculate(Statement):
+    def __init__(self, nodes = None):
+        '''Normalize new definitions in the background, each within a Budget of nodes, 0 meaning not at all,
+        or show how speculation is doing if nodes is None.'''
+        self.nodes = nodes
+    def execute(self):
+        if self.nodes == None:
+            speculator = session().speculator
+            return str(speculator) if speculator != None else 'Not speculating'
+        if self.nodes != 0:
+            ttSpeculate.startSpeculating(self.nodes)
+        else:
+            ttSpeculate.stopSpeculating()
+        return None
+
+class SSearch(Statement):
+    def __init__(self, pattern):
+        self.pattern = pattern
+    def execute(self):
+        found = ttSearch.search(self.pattern)
+        if not found:
+            return 'Nothing found'
+        return '\n'.join(var.name + ' : ' + str(var.type) for var in found)
+
+class SBackground(Statement):
+    def __init__(self, stat, source):
+        '''Run stat, whose text is source, as a background job.'''
+        self.stat = stat
+        self.source = source
+    def execute(self):
+        job = ttJobs.jobs().start(self.source, self.stat)
+        return '[' + str(job.number) + '] ' + self.source
+
+class SJobs(Statement):
+    def execute(self):
+        return str(ttJobs.jobs()) or 'No jobs'
+
+class SWait(Statement):
+    def __init__(self, number = None):
+        '''Wait for the job number, or for all jobs if number is None.'''
+        self.number = number
+    def execute(self):
+        return '\n'.join(ttJobs.jobs().wait(self.number)) or 'No jobs'
+
+class SCancel(Statement):
+    def __init__(self, number):
+        self.number = number
+    def execute(self):
+        ttJobs.jobs().get(self.number).cancel()
+        return None
+
 class SContext(Statement):
     def execute(self):
-        global globalContext
-        for n, v in globalContext.items():
+        for n, v in session().context.items():
             print(str(n) + ' : ' + str(v.type) + ' = ' + str(v.value))
         return None
 
@@ -73,20 +280,110 @@ class SSilently(Statement):
     def __init__(self, stat):
         self.stat = stat
     def execute(self):
-        self.stat.execute()
+        ttStream.force(self.stat.execute())
         return None
 
 class SUnsafely(Statement):
     def __init__(self, stat):
         self.stat = stat
     def execute(self):
+        unsafe = session().unsafeMode
         setUnsafeMode(True)
         try:
-            r = None
-            r = self.stat.execute()
+            return self.stat.execute()
         finally:
-            setUnsafeMode(False)
-            return r
+            setUnsafeMode(unsafe)
+
+class LibraryIndex(object):
+    '''A symbol index of a library file: the byte offset of the declaration of each name and the names it refers to.
+    A declaration is parsed and executed only when its name is first looked up, after the names it refers to.'''
+    def __init__(self, path):
+        self.path = path
+        self.entries = {} # name -> (offset, referenced names)
+        offset = 0
+        with open(path, 'rb') as f:
+            for line in f:
+                self.scan(line.decode(), offset)
+                offset = offset + len(line)
+    def scan(self, line, offset):
+        l = lexer.clone()
+        l.input(line)
+        tokens = list(iter(l.token, None))
+        if (len(tokens) < 2) or (tokens[0].type not in ('parameter', 'definition', 'inductive')):
+            return
+        names = [tok.value for tok in tokens if tok.type == 'name']
+        # Names followed by a colon or following a let are bound, or declared: they aren't references.
+        # A global also used as a bound name on the same line is missed, and then resolved when it is looked up.
+        bound = set(tok.value for (i, tok) in enumerate(tokens[: -1])
+            if (tok.type == 'name') and ((tokens[i + 1].type == 'colon') or (tokens[i - 1].type == 'let')))
+        # The declared name is the first one, even in a parenthesized binder. An inductive type also declares its
+        # constructors, each first after := or a bar, and its eliminator.
+        declared = names[: 1]
+        if tokens[0].type == 'inductive':
+            declared = declared + [tok.value for (i, tok) in enumerate(tokens[1 :], 1)
+                if (tok.type == 'name') and (tokens[i - 1].type in ('colonequal', 'bar'))]
+            declared.append(ttInductive.eliminatorName(names[0]))
+        references = set(names) - bound - set(declared)
+        for name in declared:
+            if name not in self.entries:
+                self.entries[name] = (offset, references)
+    def resolve(self, name):
+        # The entry is taken out while the declaration is resolved, so that cyclic references end, and put back if it fails
+        try:
+            entry = self.entries.pop(name)
+        except KeyError:
+            return False
+        try:
+            for r in entry[1]:
+                if (r in self.entries) and (r not in session().context):
+                    self.resolve(r)
+            with open(self.path, 'rb') as f:
+                f.seek(entry[0])
+                line = f.readline().decode()
+            # The declaration may be looked up in the middle of another parse, so it gets its own lexer
+            parser.parse(line, lexer = lexer.clone()).execute()
+        except:
+            self.entries[name] = entry
+            raise
+        return True
+
+class SImport(Statement):
+    def __init__(self, path):
+        self.path = path
+    def execute(self):
+        index = LibraryIndex(self.path)
+        session().resolvers.append(index.resolve)
+        return None
+
+class SPublish(Statement):
+    def __init__(self, path):
+        self.path = path
+    def execute(self):
+        return 'Published ' + str(ttShared.publish(self.path)) + ' declarations'
+
+class SAttach(Statement):
+    def __init__(self, path):
+        self.path = path
+    def execute(self):
+        ttShared.attach(self.path)
+        return None
+
+class SIngest(Statement):
+    def __init__(self, path):
+        self.path = path
+    def execute(self):
+        return '\n'.join(str(r) for r in ttIngest.ingest(self.path) if r != None)
+
+class STrace(Statement):
+    def __init__(self, path = None):
+        '''Start tracing into path, or stop tracing and write the trace if path is None.'''
+        self.path = path
+    def execute(self):
+        if self.path != None:
+            ttTrace.startTracing(self.path)
+        else:
+            ttTrace.stopTracing()
+        return None
 
 class STime(Statement):
     def __init__(self, stat):
@@ -94,11 +391,10 @@ class STime(Statement):
     def execute(self):
         t1 = clock()
         try:
-            r = self.stat.execute()
+            return ttStream.force(self.stat.execute())
         finally:
             t2 = clock()
             print(round((t2 - t1) * 100) / 100, 'sec')
-            return r
 
 keywords = \
     (
@@ -106,12 +402,30 @@ keywords = \
         'silently', 'unsafely', 'time'
     )
 
-tokens = keywords + \
+# Contextual keywords are keywords only where a statement expects them, and names elsewhere, so that they remain
+# available for declarations: each maps to the words which may precede it in its statement, after modifiers
+statementStarts = [()]
+contextualKeywords = \
+    {
+        'compiled': statementStarts, 'stats': statementStarts, 'import': statementStarts, 'limit': statementStarts,
+        'parallel': statementStarts, 'trace': statementStarts, 'inductive': statementStarts, 'speculate': statementStarts,
+        'redefine': statementStarts, 'search': statementStarts, 'ingest': statementStarts, 'optimal': statementStarts,
+        'lazy': statementStarts, 'jobs': statementStarts, 'wait': statementStarts, 'cancel': statementStarts,
+        'publish': statementStarts, 'attach': statementStarts,
+        'map': [(), ('parallel',)],
+        'within': [('check',), ('evaluate',), ('compiled', 'evaluate'), ('lazy', 'evaluate')],
+        'over': None, # after the function of a map, before its file
+        'let': None, # before a binding
+        'in': None # after the value of a binding opened by a let
+    }
+modifiers = ('silently', 'unsafely', 'time')
+
+tokens = keywords + tuple(contextualKeywords) + \
     (
         'name',
         'lparen', 'rparen', 'colon', 'colonequal', 'arrow', 'darrow',
-        'lbracket', 'rbracket',
-        'numeral',
+        'lbracket', 'rbracket', 'bar', 'ampersand',
+        'numeral', 'string',
         'comment'
     )
 
@@ -130,24 +444,68 @@ t_arrow = r'->'
 t_darrow = r'=>'
 t_lbracket = r'\['
 t_rbracket = r'\]'
+t_bar = r'\|'
+t_ampersand = r'&'
 t_comment = r'\#.*'
 
 def t_name(t):
     r'[a-zA-Z][a-zA-Z0-9]*'
     if t.value in keywords:
         t.type = t.value
+    elif (t.value in contextualKeywords) and contextual(t):
+        t.type = t.value
     return t
 
+letBinding = re.compile(r'\s*\(?\s*[a-zA-Z][a-zA-Z0-9]*\s*:') # a name and its type or value, maybe parenthesized
+
+def contextual(t):
+    '''Whether a contextual keyword stands where its statement expects it.'''
+    data = t.lexer.lexdata
+    line = data[data.rfind('\n', 0, t.lexpos) + 1 : t.lexpos]
+    words = line.split()
+    while words and (words[0] in modifiers):
+        words = words[1 :]
+    if t.value == 'over':
+        return (words[: 1] == ['map'] or words[: 2] == ['parallel', 'map']) and data[t.lexer.lexpos :].lstrip().startswith('"')
+    # A let opens a binding at its depth of parentheses, which the next in at that depth closes
+    depth = line.count('(') - line.count(')')
+    if t.value == 'let':
+        if not letBinding.match(data, t.lexer.lexpos):
+            return False
+        t.lexer.lets = t.lexer.lets + (depth,)
+        return True
+    if t.value == 'in':
+        if t.lexer.lets[-1 :] != (depth,):
+            return False
+        t.lexer.lets = t.lexer.lets[: -1]
+        return True
+    return tuple(words) in contextualKeywords[t.value]
+
 def t_numeral(t):
     r'\d+'
     t.value = int(t.value)
     return t
 
+def t_string(t):
+    r'"[^"]*"'
+    t.value = t.value[1 : -1]
+    return t
+
 t_ignore = ' \t\n'
 
 def t_error(t):
     raise ttErrors.ParsingError(t)
 
+start = 'line'
+
+def p_line(t):
+    'line : statement'
+    t[0] = t[1]
+
+def p_line_background(t):
+    'line : statement ampersand'
+    t[0] = SBackground(t[1], t.lexer.lexdata[: t.lexpos(2)].strip()) if t[1] != None else None
+
 def p_statement_parameter(t):
     'statement : parameter binder'
     t[0] = SParameter(t[2][0], t[2][1].Translate())
@@ -160,6 +518,30 @@ def p_statement_typed_definition(t):
     'statement : definition binder colonequal expression'
     t[0] = STypedDefinition(t[2][0], t[2][1].Translate(), t[4].Translate())
 
+def p_statement_redefine(t):
+    'statement : redefine name colonequal expression'
+    t[0] = SRedefine(t[2], None, t[4].Translate())
+
+def p_statement_typed_redefine(t):
+    'statement : redefine binder colonequal expression'
+    t[0] = SRedefine(t[2][0], t[2][1].Translate(), t[4].Translate())
+
+def p_statement_inductive(t):
+    'statement : inductive binder colonequal constructors'
+    t[0] = SInductive(t[2][0], t[2][1], t[4])
+
+def p_statement_empty_inductive(t):
+    'statement : inductive binder'
+    t[0] = SInductive(t[2][0], t[2][1], [])
+
+def p_constructors(t):
+    'constructors : binder'
+    t[0] = [t[1]]
+
+def p_constructors_bar(t):
+    'constructors : constructors bar binder'
+    t[0] = t[1] + [t[3]]
+
 def p_statement_check(t):
     'statement : check expression'
     t[0] = SCheck(t[2].Translate())
@@ -168,10 +550,118 @@ def p_statement_evaluate(t):
     'statement : evaluate expression'
     t[0] = SEvaluate(t[2].Translate())
 
+def p_statement_compiled_evaluate(t):
+    'statement : compiled evaluate expression'
+    t[0] = SCompiledEvaluate(t[3].Translate())
+
+def p_statement_parallel_evaluate(t):
+    'statement : parallel evaluate expression'
+    t[0] = SParallelEvaluate(t[3].Translate())
+
+def p_statement_map(t):
+    'statement : map expression over string'
+    t[0] = SMap(t[2].Translate(), t[4])
+
+def p_statement_parallel_map(t):
+    'statement : parallel map expression over string'
+    t[0] = SMap(t[3].Translate(), t[5], None)
+
+def p_statement_check_within(t):
+    'statement : check within numeral expression'
+    t[0] = SCheck(t[4].Translate(), t[3])
+
+def p_statement_evaluate_within(t):
+    'statement : evaluate within numeral expression'
+    t[0] = SEvaluate(t[4].Translate(), t[3])
+
+def p_statement_optimal_evaluate(t):
+    'statement : optimal evaluate expression'
+    t[0] = SOptimalEvaluate(t[3].Translate())
+
+def p_statement_lazy_evaluate(t):
+    'statement : lazy evaluate expression'
+    t[0] = SLazyEvaluate(t[3].Translate())
+
+def p_statement_lazy_evaluate_within(t):
+    'statement : lazy evaluate within numeral expression'
+    t[0] = SLazyEvaluate(t[5].Translate(), t[4])
+
+def p_statement_compiled_evaluate_within(t):
+    'statement : compiled evaluate within numeral expression'
+    t[0] = SCompiledEvaluate(t[5].Translate(), t[4])
+
+def p_statement_limit(t):
+    'statement : limit name numeral'
+    t[0] = SLimit(t[2], t[3])
+
+def p_statement_limits(t):
+    'statement : limit'
+    t[0] = SLimit()
+
 def p_statement_expression(t):
     'statement : expression'
     t[0] = SExpression(t[1].Translate())
 
+def p_statement_stats(t):
+    'statement : stats expression'
+    t[0] = SStats(t[2].Translate())
+
+def p_statement_stats_memo(t):
+    'statement : stats'
+    t[0] = SStats()
+
+def p_statement_import(t):
+    'statement : import string'
+    t[0] = SImport(t[2])
+
+def p_statement_publish(t):
+    'statement : publish string'
+    t[0] = SPublish(t[2])
+
+def p_statement_attach(t):
+    'statement : attach string'
+    t[0] = SAttach(t[2])
+
+def p_statement_ingest(t):
+    'statement : ingest string'
+    t[0] = SIngest(t[2])
+
+def p_statement_trace(t):
+    'statement : trace string'
+    t[0] = STrace(t[2])
+
+def p_statement_trace_stop(t):
+    'statement : trace'
+    t[0] = STrace()
+
+def p_statement_speculate(t):
+    'statement : speculate numeral'
+    t[0] = SSpeculate(t[2])
+
+def p_statement_speculate_status(t):
+    'statement : speculate'
+    t[0] = SSpeculate()
+
+def p_statement_search(t):
+    'statement : search expression'
+    t[0] = SSearch(t[2].Translate())
+
+def p_statement_jobs(t):
+    'statement : jobs'
+    t[0] = SJobs()
+
+def p_statement_wait(t):
+    'statement : wait numeral'
+    t[0] = SWait(t[2])
+
+def p_statement_wait_all(t):
+    'statement : wait'
+    t[0] = SWait()
+
+def p_statement_cancel(t):
+    'statement : cancel numeral'
+    t[0] = SCancel(t[2])
+
 def p_statement_context(t):
     'statement : context'
     t[0] = SContext()
@@ -224,6 +714,14 @@ def p_expression_lambda(t):
     'expression : binder darrow expression %prec darrow'
     t[0] = PLambda(t[1][0], t[1][1], t[3])
 
+def p_expression_let(t):
+    'expression : let name colonequal expression in expression %prec darrow'
+    t[0] = PLet(t[2], None, t[4], t[6])
+
+def p_expression_typed_let(t):
+    'expression : let binder colonequal expression in expression %prec darrow'
+    t[0] = PLet(t[2][0], t[2][1], t[4], t[6])
+
 # For some reason precedence doesn't work here. So we emulate it.
 
 def p_expression_application_expression(t):
@@ -242,6 +740,10 @@ def p_simple_expression_type(t):
     'simple_expression : type lbracket numeral rbracket'
     t[0] = PUniverse(t[3])
 
+def p_simple_expression_numeral(t):
+    'simple_expression : numeral'
+    t[0] = PNatLiteral(t[1])
+
 def p_simple_expression_name(t):
     'simple_expression : name'
     t[0] = PVariable(t[1])
@@ -253,8 +755,9 @@ def p_simple_expression_paren(t):
 def p_error(t):
     raise ttErrors.ParsingError(t)
 
-lex.lex()
-yacc.yacc()
+lexer = lex.lex()
+lexer.lets = () # the depths of the lets whose in is still to come, copied by clone
+parser = yacc.yacc()
 
 def debugLex(s):
     lex.input(s)
@@ -262,4 +765,6 @@ def debugLex(s):
         print(repr(tok.type), repr(tok.value))
 
 def parse(s):
-    return yacc.parse(s)
+    '''Parse a statement in the active Session. Each parse gets its own lexer, so that threads can parse concurrently.'''
+    with ttTrace.span('parse'):
+        return parser.parse(s, lexer = lexer.clone())
@@ -1,6 +1,8 @@
 import ttCore
 from ttCore import *
 
+import ttTrace
+
 # A separate simplified class hierarchy designed for handling named variables and turning them into de Bruijn indices
 
 class PTerm(object):
@@ -22,13 +24,14 @@ class PTerm(object):
         for c in self.children:
             c.shiftTypes()
     def Translate(self):
-        for name in self.free:
-            for var in self.free[name]:
-                var.glob = True
-        self.calcIndices()
-        translation = self.translate()
-        self.shiftTypes()
-        return translation
+        with ttTrace.span('translate'):
+            for name in self.free:
+                for var in self.free[name]:
+                    var.glob = True
+            self.calcIndices()
+            translation = self.translate()
+            self.shiftTypes()
+            return translation
 
 class PVariable(PTerm):
     def __init__(self, name):
@@ -82,6 +85,36 @@ class PAbstraction(PTerm):
             for v in self.term.free[self.name]:
                 v.translation.varType = self.translation.varType
 
+class PLet(PTerm):
+    def __init__(self, name, type, value, term):
+        '''type is None for an untyped let, whose variable gets the type of value.'''
+        self.name = name
+        self.type = type
+        self.value = value
+        self.term = term
+        self.children = ([type] if type != None else []) + [value, PBinder(name, term)]
+        self.free = {}
+        self.mergeFree()
+    def linkLet(self):
+        if self.name in self.term.free:
+            for v in self.term.free[self.name]:
+                v.translation.varType = self.translation.varType
+    def translate(self):
+        self.translation = TLet(self.name, self.type.translate() if self.type != None else None, self.value.translate(), self.term.translate())
+        if self.type != None:
+            self.linkLet()
+        return self.translation
+    def shiftTypes(self):
+        if self.type != None:
+            super(PLet, self).shiftTypes()
+            return
+        # The type of the value is only known once the types inside the value are final,
+        # and it has to be linked before the occurrences' types are shifted
+        self.value.shiftTypes()
+        self.translation.varType = self.translation.value.type()
+        self.linkLet()
+        self.children[-1].shiftTypes()
+
 class PUniverse(PTerm):
     def __init__(self, n):
         self.n = n
@@ -90,6 +123,14 @@ class PUniverse(PTerm):
     def translate(self):
         return TUniverse(self.n)
 
+class PNatLiteral(PTerm):
+    def __init__(self, n):
+        self.n = n
+        self.children = []
+        self.free = {}
+    def translate(self):
+        return TNatLiteral(self.n)
+
 class PProduct(PAbstraction):
     def __init__(self, name, type, term):
         super(PProduct, self).__init__(name, type, term)
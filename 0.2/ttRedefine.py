@@ -0,0 +1,90 @@
+import ttCore
+from ttCore import *
+
+import ttErasure
+import ttSpeculate
+
+# Redefinition of global definitions in a live Session. The Variable is kept, so that the terms referring to it
+# see the new definition, and its dependents, found in the reverse dependency index of the Session, are rechecked
+# in dependency order. The caches which may hold the old definition are invalidated first: the memo entries and
+# compiled values of the terms of the Variable and of its dependents, their compiled and erased values and checks,
+# and the memoized applications of them or to arguments referring to them.
+# A dependent which no longer checks, or which depends on a broken one, is marked broken until it is redefined,
+# and referring to it is an error.
+
+def redefine(name, type, value):
+    '''Give the definition name a new value, and a new type unless type is None, in which case it is inferred.
+    Return the rechecked dependents and the broken ones, as a list of (name, error) pairs.'''
+    s = session()
+    var = s.context.get(name)
+    if var == None:
+        raise UnknownVariableError(name)
+    # Parameters, primitives and the declarations of inductive types have no definition to replace
+    if (var.value == None) or (isinstance(var.value, (TPrimitive, TConstructed)) and not isinstance(var.value, TNatLiteral)):
+        raise RedefinitionError(name, 'it is not a definition')
+    dependents = s.transitiveDependents(var)
+    cycle = (references(type) | references(value)) & (set(dependents) | {var})
+    if cycle:
+        raise RedefinitionError(name, 'the new definition refers to ' + ', '.join(sorted(d.name for d in cycle)) + ', which depends on it')
+    # The new definition is checked before anything changes, as a new one would be
+    ttErasure.check(value)
+    inferred = type == None
+    if inferred:
+        type = value.type()
+    elif not convertible(value.type(), type):
+        raise TypeMismatchError(value, value.type().normalize(), type.normalize())
+    if s.speculator != None:
+        for v in [var] + dependents:
+            s.speculator.cancel(v)
+    for v in [var] + dependents:
+        invalidate(v)
+    applications.forget(set([var] + dependents))
+    s.unindex(var)
+    (var.type, var.value, var.inferred, var.broken) = (type, value, inferred, None)
+    s.index(var)
+    broken = []
+    for d in dependents:
+        d.broken = recheck(d)
+        if d.broken != None:
+            broken.append((d.name, d.broken))
+        else:
+            ttSpeculate.speculate(d)
+        # The normal type of a dependent may change with the definitions it refers to, even if its type doesn't
+        if s.typeIndex != None:
+            s.typeIndex.add(d)
+    ttSpeculate.speculate(var)
+    return (dependents, broken)
+
+def invalidate(var):
+    '''Drop everything computed from the definition of var, which is about to change.'''
+    for t in list(subterms(var.type)) + list(subterms(var.value)):
+        if isinstance(t, Term):
+            memo.forget(t)
+        t.__dict__.pop('_compiledValue', None)
+    var.__dict__.pop('_compiledValue', None)
+    var.__dict__.pop('_erasedValue', None)
+    var.__dict__.pop('_checked', None)
+
+def recheck(var):
+    '''Recheck a dependent of a redefined Variable, whose own dependencies have been rechecked, and return the error
+    which breaks it, or None. An inferred type is inferred again, which may change it.'''
+    for r in references(var.type) | references(var.value):
+        if r.broken != None:
+            return BrokenDefinitionError(r.name, r.broken)
+    s = session()
+    try:
+        if var.value == None:
+            if not isinstance(var.type.type().normalize(), TUniverse):
+                raise TypeExpectedError(var.type)
+        elif var.inferred:
+            ttErasure.check(var.value)
+            s.unindex(var)
+            var.type = var.value.type()
+            s.index(var)
+        else:
+            ttErasure.check(var.value)
+            if not convertible(var.value.type(), var.type):
+                raise TypeMismatchError(var.value, var.value.type().normalize(), var.type.normalize())
+    except TypeTheoreticError as e:
+        return e
+    return None
@@ -0,0 +1,86 @@
+import ttCore
+from ttCore import *
+
+# Search of the global context by type. The normal types of the global Variables are indexed by fingerprints:
+# the shapes of the domains of their products and of their conclusion, a shape being a head symbol and the number
+# of arguments it is applied to. Only the few Variables sharing the fingerprint of the pattern are compared with it.
+# The index of a Session is created by its first search, from its context. The Session then hands it the Variables it
+# registers and those whose types change, which the next search indexes, so that searching doesn't walk the context.
+# A Variable whose type fails to normalize is skipped, and retried by the next search if it ran out of its limits.
+
+def shape(term):
+    '''The head symbol of a normal term, a name, a universe or a de Bruijn index, and the number of its arguments.'''
+    n = 0
+    while isinstance(term, TApplication):
+        term = term.term1
+        n = n + 1
+    if isinstance(term, TBoundVariable):
+        return (term.deBruijn, n)
+    elif isinstance(term, TConstructed):
+        return (term.constructor.name, n + len(term.args))
+    elif isinstance(term, (TGlobalVariable, TUniverse, TPrimitive)):
+        return (str(term), n)
+    else:
+        return (term.__class__.__name__, n)
+
+def fingerprint(type):
+    '''The fingerprint of a normal type.'''
+    domains = []
+    while isinstance(type, TProduct):
+        domains.append(shape(type.varType))
+        type = type.term
+    return (tuple(domains), shape(type))
+
+class TypeIndex(object):
+    def __init__(self, context):
+        self.buckets = {} # fingerprint -> the Variables having it, in the order they were indexed
+        self.entries = {} # Variable -> (its normal type, its fingerprint)
+        self.pending = list(context.values()) # the Variables to index by the next search
+    def add(self, var):
+        '''Index var again by the next search, since it is new or its normal type may have changed.'''
+        self.pending.append(var)
+    def remove(self, var):
+        '''Stop indexing var, which is leaving the context.'''
+        self.pending = [v for v in self.pending if v is not var]
+        entry = self.entries.pop(var, None)
+        if entry != None:
+            self.buckets[entry[1]].remove(var)
+    def update(self):
+        '''Index the pending Variables. Those whose types fail to normalize within the limits are left pending.'''
+        (pending, self.pending) = (self.pending, [])
+        done = set()
+        for (i, var) in enumerate(pending):
+            if var in done:
+                continue
+            done.add(var)
+            entry = self.entries.pop(var, None)
+            if entry != None:
+                self.buckets[entry[1]].remove(var)
+            try:
+                normal = var.type.normalize()
+            except (ResourceLimitError, CancelledError):
+                self.pending.append(var)
+                continue
+            except TypeTheoreticError:
+                continue
+            except BaseException:
+                self.pending.extend(pending[i :])
+                raise
+            f = fingerprint(normal)
+            self.entries[var] = (normal, f)
+            self.buckets.setdefault(f, []).append(var)
+    def search(self, pattern, context):
+        '''The Variables of context whose type is convertible with the pattern, a type.'''
+        self.update()
+        normal = pattern.normalize()
+        return [var for var in self.buckets.get(fingerprint(normal), [])
+            if (context.get(var.name) is var) and (var.broken == None) and (self.entries[var][0] == normal)]
+
+def search(pattern):
+    '''Search the context of the active Session for the Variables of type pattern.'''
+    if not isinstance(pattern.type().normalize(), TUniverse):
+        raise TypeExpectedError(pattern)
+    s = session()
+    if s.typeIndex == None:
+        s.typeIndex = TypeIndex(s.context)
+    return s.typeIndex.search(pattern, s.context)
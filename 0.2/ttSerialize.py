@@ -0,0 +1,178 @@
+import ttCore
+from ttCore import *
+
+import ttErrors
+
+# A flat serialization of terms which preserves sharing, for shipping terms to other processes.
+# A term is encoded as a list of nodes, each a tuple of a tag and fields, in which subterms and substitutions
+# are referred to by their positions in the list. Children precede their parents and the root comes last.
+# Nodes are also shared when they are structurally equal, as the many shifts of the types of bound variables are.
+# Memo entries and compiled values are left out, global Variables are referred to by name.
+# Decoded substitutions are never verified, whatever their nodes claim, so that their entries are checked as they are
+# substituted. Terms from outside are also rebound: the types of their bound variables, which the kernel trusts,
+# are rebuilt from their binders.
+
+def encode(term):
+    '''Encode a term or a substitution as a list of nodes, without recursion.'''
+    index = {}
+    positions = {} # node -> its position
+    nodes = []
+    stack = [(term, False)]
+    while stack:
+        (node, expanded) = stack.pop()
+        if id(node) in index:
+            continue
+        if expanded:
+            e = encodeNode(node, index)
+            if e not in positions:
+                positions[e] = len(nodes)
+                nodes.append(e)
+            index[id(node)] = positions[e]
+        else:
+            stack.append((node, True))
+            for c in node.children():
+                if id(c) not in index:
+                    stack.append((c, False))
+    return nodes
+
+def encodeNode(node, index):
+    if isinstance(node, TBoundVariable):
+        return ('bound', node.name, index[id(node.varType)] if node.varType != None else None, node.deBruijn)
+    elif isinstance(node, TGlobalVariable):
+        return ('global', node.var.name)
+    elif isinstance(node, TUniverse):
+        return ('universe', node.n)
+    elif isinstance(node, TNatLiteral):
+        return ('nat', node.n)
+    elif isinstance(node, TDeclaredPrimitive):
+        return ('declared', node.name)
+    elif isinstance(node, TConstructed):
+        return ('constructed', node.constructor.name, tuple(index[id(a)] for a in node.args))
+    elif isinstance(node, TPrimitive):
+        return ('primitive', node.__class__.__name__)
+    elif isinstance(node, TLambda):
+        return ('lambda', node.name, index[id(node.varType)], index[id(node.term)])
+    elif isinstance(node, TProduct):
+        return ('product', node.name, index[id(node.varType)], index[id(node.term)])
+    elif isinstance(node, TApplication):
+        return ('application', index[id(node.term1)], index[id(node.term2)])
+    elif isinstance(node, TLet):
+        return ('let', node.name, index[id(node.varType)] if node.varType != None else None, index[id(node.value)], index[id(node.term)])
+    elif isinstance(node, TSubstitution):
+        return ('substitution', index[id(node.term)], index[id(node.sub)])
+    elif isinstance(node, SComposition):
+        return ('composition', index[id(node.sub1)], index[id(node.sub2)])
+    elif isinstance(node, SConcat):
+        return ('concat', index[id(node.sub)], index[id(node.term)], node.verified)
+    elif isinstance(node, SNormalized):
+        return ('normalized', index[id(node.sub)])
+    elif isinstance(node, Substitution):
+        return ('subs', tuple(index[id(t)] for t in node.children()), node.shift, node.verified)
+    else:
+        raise TypeError('Cannot encode ' + repr(node))
+
+def decode(nodes):
+    '''Rebuild the term or substitution encoded by encode(). Global Variables are looked up in the active Session.
+    Nodes which are malformed, or refer to anything but an earlier node of the right kind, are an IngestionError.'''
+    r = []
+    def child(i, kind):
+        if not ((type(i) is int) and (0 <= i < len(r)) and isinstance(r[i], kind)):
+            raise ttErrors.IngestionError('node ' + str(len(r)) + ' refers to ' + repr(i) + ', which is not an earlier ' +
+                ('term' if kind is Term else 'substitution'))
+        return r[i]
+    def natural(n, least = 0):
+        if not ((type(n) is int) and (n >= least)):
+            raise ttErrors.IngestionError('node ' + str(len(r)) + ' has ' + repr(n) + ' where a number is expected')
+        return n
+    def name(n):
+        if not isinstance(n, str):
+            raise ttErrors.IngestionError('node ' + str(len(r)) + ' has ' + repr(n) + ' where a name is expected')
+        return n
+    for node in nodes:
+        tag = node[0]
+        if tag == 'bound':
+            r.append(TBoundVariable(name(node[1]), child(node[2], Term) if node[2] != None else None, natural(node[3], 1)))
+        elif tag == 'global':
+            r.append(TGlobalVariable(Variable(name(node[1]))))
+        elif tag == 'universe':
+            r.append(TUniverse(natural(node[1])))
+        elif tag == 'nat':
+            r.append(TNatLiteral(natural(node[1])))
+        elif tag == 'declared':
+            r.append(declaredPrimitive(name(node[1])))
+        elif tag == 'constructed':
+            r.append(TConstructed(declaredPrimitive(name(node[1])), [child(i, Term) for i in node[2]]))
+        elif tag == 'primitive':
+            cls = getattr(ttCore, name(node[1]), None)
+            if not (isinstance(cls, type) and issubclass(cls, TPrimitive)):
+                raise ttErrors.IngestionError('unknown primitive ' + repr(node[1]))
+            r.append(cls())
+        elif tag == 'lambda':
+            r.append(TLambda(name(node[1]), child(node[2], Term), child(node[3], Term)))
+        elif tag == 'product':
+            r.append(TProduct(name(node[1]), child(node[2], Term), child(node[3], Term)))
+        elif tag == 'application':
+            r.append(TApplication(child(node[1], Term), child(node[2], Term)))
+        elif tag == 'let':
+            r.append(TLet(name(node[1]), child(node[2], Term) if node[2] != None else None, child(node[3], Term), child(node[4], Term)))
+        elif tag == 'substitution':
+            r.append(TSubstitution(child(node[1], Term), child(node[2], Substitution)))
+        elif tag == 'composition':
+            r.append(SComposition(child(node[1], Substitution), child(node[2], Substitution)))
+        elif tag == 'concat':
+            r.append(SConcat(child(node[1], Substitution), child(node[2], Term)))
+        elif tag == 'normalized':
+            r.append(SNormalized(child(node[1], Substitution)))
+        elif tag == 'subs':
+            r.append(Substitution(subs = [child(i, Term) for i in node[1]], shift = natural(node[2])))
+        else:
+            raise ttErrors.IngestionError('unknown node tag ' + repr(tag))
+    if not r:
+        raise ttErrors.IngestionError('no nodes')
+    return r[-1]
+
+def rebind(term):
+    '''Rebuild a closed term so that each of its bound variables has the type of its binder, rather than the type it
+    was built with. Explicit substitutions are applied on the way, their entries checked unless in unsafe mode.'''
+    done = {} # (id of a subterm, id of its context or None if it is closed) -> (the rebuilt subterm, the key's objects)
+    def rebuild(t, context):
+        '''context is None or a pair of the rebuilt type of the innermost binder and the context outside it.'''
+        if t.loose == 0:
+            context = None
+        key = (id(t), id(context))
+        if key not in done:
+            done[key] = (rebuildNode(t, context), t, context)
+        return done[key][0]
+    def rebuildNode(t, context):
+        if isinstance(t, TBoundVariable):
+            c = context
+            for _ in range(t.deBruijn - 1):
+                c = c[1] if c != None else None
+            if c == None:
+                raise ttErrors.IngestionError('unbound variable ' + repr(t.name))
+            return TBoundVariable(t.name, Substitution(shift = t.deBruijn) * c[0], t.deBruijn)
+        elif isinstance(t, TAbstraction):
+            varType = rebuild(t.varType, context)
+            return t.__class__(t.name, varType, rebuild(t.term, (varType, context)))
+        elif isinstance(t, TApplication):
+            return TApplication(rebuild(t.term1, context), rebuild(t.term2, context))
+        elif isinstance(t, TLet):
+            value = rebuild(t.value, context)
+            varType = rebuild(t.varType, context) if t.varType != None else value.type()
+            return TLet(t.name, varType, value, rebuild(t.term, (varType, context)))
+        elif isinstance(t, TSubstitution):
+            return rebuild(t.sub * t.term, context)
+        elif isinstance(t, TConstructed):
+            return TConstructed(t.constructor, [rebuild(a, context) for a in t.args])
+        else:
+            return t
+    return rebuild(term, None)
+
+def declaredPrimitive(name):
+    '''The primitive declared as the global Variable name. Constructors without arguments are declared as TConstructed.'''
+    value = Variable(name).value
+    if isinstance(value, TConstructed):
+        return value.constructor
+    if not isinstance(value, TDeclaredPrimitive):
+        raise ttErrors.IngestionError(name + ' is not part of an inductive declaration')
+    return value
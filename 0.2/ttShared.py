@@ -0,0 +1,99 @@
+import ttCore
+from ttCore import *
+
+import ttErasure
+import ttErrors
+import ttIngest
+import ttParser
+
+import json
+import mmap
+import os
+import struct
+import tempfile
+
+# Read-only libraries shared by processes. A checked global context is published once into a file, preferably
+# on a memory file system such as /dev/shm, in the flat encoding of ttIngest: a line per declaration, each
+# definition with its type, and terms as ttSerialize node lists, which refer to their subterms by position and to
+# globals by name. An index of the lines by name follows them. Like any ingested line, a declaration is checked
+# when it is decoded, since the file may have been written by anyone.
+# Processes attach to a library by mapping the file read-only, so that they all share the pages of the one copy
+# the system caches, and by installing a resolver in their Session: a declaration is decoded only when its name is
+# first looked up, after the names it refers to, so that each process holds the Terms of what it uses only.
+# Primitives are declared by every Session, and inductive declarations can't be published.
+# A library is written into a temporary file next to its path, which then replaces it at once: processes attached to
+# a previous version keep the pages they mapped, and none ever maps a partly written library.
+
+magic = b'TTLIB001'
+trailer = struct.Struct('<QQ') # the offset and the length of the index
+
+def publish(path, context = None):
+    '''Publish the declarations of a context, the one of the active Session by default, into the file path.
+    Return the number of declarations published.'''
+    if context is None:
+        context = session().context
+    index = {}
+    (fd, temporary) = tempfile.mkstemp(prefix = '.' + os.path.basename(path) + '.', dir = os.path.dirname(path) or '.')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(magic)
+            for var in context.values():
+                if isinstance(var.value, natPrimitives):
+                    continue
+                line = (export(var) + '\n').encode()
+                index[var.name] = (f.tell(), len(line))
+                f.write(line)
+            offset = f.tell()
+            encoded = json.dumps(index, separators = (',', ':')).encode()
+            f.write(encoded)
+            f.write(trailer.pack(offset, len(encoded)))
+        # Temporary files are private, but a library is read by other processes, as a file open() created would be
+        os.chmod(temporary, 0o644)
+        os.replace(temporary, path)
+    except:
+        os.remove(temporary)
+        raise
+    return len(index)
+
+def export(var):
+    if var.broken != None:
+        raise BrokenDefinitionError(var.name, var.broken)
+    if isinstance(var.value, (TDeclaredPrimitive, TConstructed)):
+        raise PublicationError(var.name, 'it is part of an inductive declaration')
+    if var.value == None:
+        return ttIngest.export(ttParser.SParameter(var.name, var.type))
+    ttErasure.checkDefinition(var)
+    return ttIngest.export(ttParser.STypedDefinition(var.name, var.type, var.value))
+
+class Library(object):
+    '''A published library, mapped read-only.'''
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+        if self.map[: len(magic)] != magic:
+            raise ttErrors.IngestionError(path + ' is not a library')
+        (offset, length) = trailer.unpack(self.map[-trailer.size :])
+        self.entries = json.loads(self.map[offset : offset + length].decode()) # name -> (offset, length)
+    def resolve(self, name):
+        '''Declare name in the active Session if the library has it.'''
+        # As for a LibraryIndex, the entry is taken out while it resolves and put back if that fails
+        try:
+            (offset, length) = self.entries.pop(name)
+        except KeyError:
+            return False
+        try:
+            # Decoding looks up the names the declaration refers to, which declares them first
+            ttIngest.statement(self.map[offset : offset + length].decode()).execute()
+        except:
+            self.entries[name] = (offset, length)
+            raise
+        return True
+    def close(self):
+        self.map.close()
+
+def attach(path):
+    '''Attach the active Session to the library published into the file path.'''
+    library = Library(path)
+    session().resolvers.append(library.resolve)
+    return library
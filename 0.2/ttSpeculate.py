@@ -0,0 +1,118 @@
+import ttCore
+from ttCore import *
+
+import ttErasure
+
+import heapq
+import itertools
+import threading
+
+# Speculative normalization. Accepted definitions are queued to a worker thread, which computes the weak head
+# normal form and the normal form of their values and the normal form of their types while the user is thinking.
+# The results land in the memo store, where later queries find them, and the checked erased value of the definition
+# is cached for evaluate.
+# Each job runs within a Budget of nodes, and is dropped if it exceeds it. No job starts while the memo store is
+# more than three quarters full, so that speculation doesn't evict entries on behalf of work nobody asked for.
+
+class Speculator(object):
+    '''A worker thread normalizing the definitions of a Session, most urgent first.'''
+    def __init__(self, session, nodes = None, stackSize = 512 * 1024 * 1024):
+        self.session = session
+        self.nodes = nodes
+        self.queue = [] # a heap of (priority, sequence number, Variable)
+        self.sequence = itertools.count()
+        self.cancelled = set() # Variables whose pending jobs are to be skipped
+        self.running = None # the Variable being normalized and the Budget of the job
+        self.condition = threading.Condition()
+        self.stopped = False
+        self.done = 0
+        self.dropped = 0
+        # The stack size is read when the thread starts
+        oldStackSize = threading.stack_size(stackSize)
+        try:
+            self.thread = threading.Thread(target = self.work, daemon = True)
+            self.thread.start()
+        finally:
+            threading.stack_size(oldStackSize)
+    def submit(self, var, priority = None):
+        '''Queue the definition of var. Lower priorities go first, the newest definition by default.'''
+        with self.condition:
+            seq = next(self.sequence)
+            self.cancelled.discard(var)
+            heapq.heappush(self.queue, (priority if priority != None else -seq, seq, var))
+            self.condition.notify()
+    def cancel(self, var):
+        '''Give up on var, which has been superseded, whether its job is pending or running.'''
+        with self.condition:
+            if any(v is var for (_, _, v) in self.queue):
+                self.cancelled.add(var)
+            if (self.running != None) and (self.running[0] is var):
+                self.running[1].cancel()
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.queue = []
+            if self.running != None:
+                self.running[1].cancel()
+            self.condition.notify()
+        self.thread.join()
+    def pending(self):
+        return len(self.queue) - len(self.cancelled)
+    def take(self):
+        '''Wait for the next job and mark it as running, or return None once stopped.'''
+        with self.condition:
+            while True:
+                while not (self.queue or self.stopped):
+                    self.condition.wait()
+                if self.stopped:
+                    return None
+                (_, _, var) = heapq.heappop(self.queue)
+                if var in self.cancelled:
+                    self.cancelled.discard(var)
+                    continue
+                self.running = (var, Budget(nodes = self.nodes))
+                return self.running
+    def work(self):
+        while True:
+            job = self.take()
+            if job == None:
+                return
+            (var, budget) = job
+            try:
+                if len(memo) < memo.maxEntries * 3 // 4:
+                    runIn(self.session, lambda: runWithin(budget, lambda: self.normalize(var)))
+                    self.done += 1
+                else:
+                    self.dropped += 1
+            except Exception:
+                # Exceeded budgets, cancellations and errors alike: speculation is best effort
+                self.dropped += 1
+            finally:
+                with self.condition:
+                    self.running = None
+    def normalize(self, var):
+        var.value.normalizeLazily()
+        var.value.normalize()
+        var.type.normalize()
+        ttErasure.erasedValue(var)
+    def __str__(self):
+        return (str(self.pending()) + ' pending, ' + ('1' if self.running != None else '0') + ' running, ' +
+            str(self.done) + ' done, ' + str(self.dropped) + ' dropped, ' +
+            ('nodes ' + str(self.nodes) if self.nodes != None else 'unlimited'))
+
+def speculate(var):
+    '''Queue the definition of var if the active Session speculates.'''
+    speculator = session().speculator
+    if (speculator != None) and (var.value != None):
+        speculator.submit(var)
+
+def startSpeculating(nodes = None):
+    '''Speculate in the active Session, each definition within a Budget of nodes.'''
+    stopSpeculating()
+    session().speculator = Speculator(session(), nodes)
+
+def stopSpeculating():
+    s = session()
+    if s.speculator != None:
+        s.speculator.stop()
+        s.speculator = None
@@ -0,0 +1,55 @@
+import ttCore
+from ttCore import *
+
+# Head-first streaming of normal forms. Rather than building the whole normal form and then printing it, a term is
+# reduced to weak head normal form by normalizeLazily, the text of its head is yielded, and its subterms are reduced
+# the same way only when the printing reaches them. The pieces make up the printed normal form, outermost first, so
+# a large result shows up progressively and a consumer which stops after a prefix saves the rest of the work.
+# Pending subterms are kept on an explicit stack, so that deep normal forms don't nest generators.
+
+def tokens(term):
+    '''Yield the printed normal form of term, in pieces from left to right.'''
+    return pieces(term, lambda t: t.normalizeLazily())
+
+class Stream(object):
+    '''The normal form of a term, streamed within limits as it is iterated, which are shared by the whole iteration.
+    Its string is the whole normal form.'''
+    def __init__(self, term, limits = {}):
+        self.term = term
+        self.budget = Budget(**limits) if any(l != None for l in limits.values()) else None
+        # The statement is over when the Stream is iterated, so its Session and mode are restored for each piece
+        self.session = session()
+        self.unsafe = self.session.unsafeMode
+    def pieces(self):
+        '''The pieces of the string, computed as they are iterated.'''
+        return tokens(self.term)
+    def __iter__(self):
+        pieces = self.pieces()
+        while True:
+            piece = runIn(self.session, lambda: self.next(pieces))
+            if piece == None:
+                return
+            yield piece
+    def next(self, pieces):
+        unsafe = self.session.unsafeMode
+        setUnsafeMode(self.unsafe)
+        try:
+            if self.budget is None:
+                return next(pieces, None)
+            return runWithin(self.budget, lambda: next(pieces, None))
+        finally:
+            setUnsafeMode(unsafe)
+    def __str__(self):
+        return ''.join(self)
+    def write(self, out):
+        '''Write the normal form to the file out as it is computed.'''
+        try:
+            for piece in self:
+                out.write(piece)
+                out.flush()
+        finally:
+            out.write('\n')
+
+def force(r):
+    '''A statement's result with a Stream computed into its string, for the statements which need it now.'''
+    return str(r) if isinstance(r, Stream) else r
@@ -0,0 +1,57 @@
+import ttCore
+
+import json
+import os
+import threading
+import time
+
+from contextlib import contextmanager
+
+# Tracing in the Chrome trace-event format, to be opened in a flame-chart viewer such as chrome://tracing or Perfetto.
+# Spans cover parsing, translation, type inference, normalization, conversion checks and unfolding of definitions.
+# Each Session has its own tracer. The kernel only tests it on memo misses, so tracing costs next to nothing while it is off.
+
+class Tracer(object):
+    '''Records begin and end events, to be written out to path as a JSON trace.'''
+    def __init__(self, path):
+        self.path = path
+        self.events = []
+        self.start = time.perf_counter()
+    def begin(self, name, detail = None):
+        self.events.append(('B', name, detail, time.perf_counter(), threading.get_ident()))
+    def end(self, name):
+        self.events.append(('E', name, None, time.perf_counter(), threading.get_ident()))
+    def traceEvents(self):
+        pid = os.getpid()
+        for (phase, name, detail, t, tid) in self.events:
+            e = {'name': name, 'ph': phase, 'ts': (t - self.start) * 1000000, 'pid': pid, 'tid': tid}
+            if detail != None:
+                e['args'] = {'detail': detail}
+            yield e
+    def write(self):
+        with open(self.path, 'w') as f:
+            json.dump({'traceEvents': list(self.traceEvents()), 'displayTimeUnit': 'ms'}, f)
+
+@contextmanager
+def span(name, detail = None):
+    '''A span recorded by the current Tracer, if any.'''
+    tracer = ttCore.session().tracer
+    if tracer is None:
+        yield
+        return
+    tracer.begin(name, detail)
+    try:
+        yield
+    finally:
+        tracer.end(name)
+
+def startTracing(path):
+    '''Start tracing the active Session into path.'''
+    stopTracing()
+    ttCore.setTracer(Tracer(path))
+
+def stopTracing():
+    '''Stop tracing, if we are, and write the trace.'''
+    tracer = ttCore.setTracer(None)
+    if tracer is not None:
+        tracer.write()
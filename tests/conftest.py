@@ -0,0 +1,29 @@
+###########################################################################################
+# Shared setup of the tests of 0.2: its modules are imported from its directory, as       #
+# __init__.py does, and each test runs its statements in a fresh Session.                 #
+###########################################################################################
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '0.2'))
+sys.setrecursionlimit(100000)
+
+import pytest
+
+import ttCore
+import ttParser
+
+@pytest.fixture
+def run():
+    '''Execute statements, one per line, in a fresh Session and return the result of the last one.'''
+    session = ttCore.Session()
+    def execute(statements):
+        def go():
+            r = None
+            for line in statements.strip().splitlines():
+                r = ttParser.parse(line).execute()
+            return r
+        return ttCore.runIn(session, go)
+    execute.session = session
+    return execute
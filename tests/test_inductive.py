@@ -0,0 +1,21 @@
+import pytest
+
+import ttErrors
+
+def test_failed_declaration_restores_primitives(run):
+    nat = run.session.context['Nat']
+    succ = run.session.context['succ']
+    with pytest.raises(ttErrors.TypeTheoreticError):
+        run('inductive Nat : type[0] := zero : Nat | succ : Nat -> Nat | bad : (Nat -> Nat) -> Nat')
+    assert run.session.context['Nat'] is nat
+    assert run.session.context['succ'] is succ
+    assert 'zero' not in run.session.context
+    assert str(run('evaluate succ 2')) == '3'
+
+def test_failed_declaration_leaves_no_index(run):
+    run('search type[0]')
+    with pytest.raises(ttErrors.TypeTheoreticError):
+        run('inductive Bad : type[0] := bad : (Bad -> Bad) -> Bad')
+    index = run.session.typeIndex
+    assert all(var.name != 'Bad' for var in list(index.entries) + index.pending)
+    assert all(var.name != 'Bad' for var in run.session.dependents)
@@ -0,0 +1,33 @@
+import ttParser
+
+library = '''parameter N : type[0]
+definition id := (x : N) => x
+definition twice := (f : N -> N) => (x : N) => let y := f x in f y
+inductive Bool : type[0] := true : Bool | false : Bool
+inductive Box : type[0] -> type[0] := box : (A : type[0]) -> (a : A) -> Box A
+definition not := (b : Bool) => boolElim (c : Bool => Bool) false true b
+'''
+
+def index(tmp_path):
+    path = tmp_path / 'library.txt'
+    path.write_text(library)
+    return ttParser.LibraryIndex(str(path))
+
+def test_binders_are_not_references(tmp_path):
+    entries = index(tmp_path).entries
+    assert entries['id'][1] == {'N'}
+    assert entries['twice'][1] == {'N'}
+
+def test_inductive_declarations(tmp_path):
+    entries = index(tmp_path).entries
+    assert entries['true'] == entries['false'] == entries['boolElim'] == entries['Bool']
+    assert entries['Bool'][1] == set()
+    assert entries['box'] == entries['boxElim'] == entries['Box']
+    assert entries['not'][1] == {'Bool', 'boolElim', 'false', 'true'}
+
+def test_constructors_resolve(run, tmp_path):
+    path = tmp_path / 'library.txt'
+    path.write_text(library)
+    run('import "' + str(path) + '"')
+    assert str(run('evaluate not true')) == 'false'
+    assert str(run('check box')).startswith('((A : type[0])')
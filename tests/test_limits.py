@@ -0,0 +1,29 @@
+import pytest
+
+import ttCore
+import ttErrors
+import ttParser
+
+numerals = '''
+definition numeral := (T : type[0]) -> (T -> T) -> T -> T
+definition one := (T : type[0]) => (f : T -> T) => (x : T) => f x
+definition plus := (n1 : numeral) => (n2 : numeral) => (T : type[0]) => (f : T -> T) => (x : T) => n1 T f (n2 T f x)
+definition two := plus one one
+definition power := (n1 : numeral) => (n2 : numeral) => (T : type[0]) => n2 (T -> T) (n1 T)
+'''
+
+def test_abbreviation(run):
+    run(numerals)
+    normal = ttCore.runIn(run.session, lambda: ttParser.parse('stats power two (plus two two)').term.normalize())
+    assert normal.abbreviation(1000) == str(normal)
+    assert normal.abbreviation(50) == str(normal)[: 50] + '...'
+
+def test_partial_is_abbreviated(run):
+    run(numerals)
+    run('limit steps 5000')
+    with pytest.raises(ttErrors.ResourceLimitError) as e:
+        run('unsafely evaluate power two (power two (plus two two))')
+    assert isinstance(e.value.partial, ttCore.TLambda)
+    message = str(e.value).split('\n')
+    assert message[0].startswith('Resource limit exceeded: steps')
+    assert message[1].startswith('Weak head normal form: (T : ') and (len(message[1]) <= len('Weak head normal form: ') + 303)
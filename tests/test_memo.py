@@ -0,0 +1,22 @@
+import ttCore
+from ttCore import MemoStore
+
+def test_forget_then_clear():
+    store = MemoStore()
+    (t1, t2) = (ttCore.TUniverse(0), ttCore.TUniverse(1))
+    store.put(t1, MemoStore.NORMAL, t1)
+    store.put(t2, MemoStore.NORMAL, t2)
+    store.forget(t1)
+    assert t1._memo is None
+    store.clear()
+    assert (t2._memo is None) and (len(store) == 0)
+
+def test_evict_after_forget():
+    store = MemoStore(maxEntries = 2)
+    terms = [ttCore.TUniverse(n) for n in range(3)]
+    store.put(terms[0], MemoStore.NORMAL, terms[0])
+    store.put(terms[1], MemoStore.NORMAL, terms[1])
+    store.forget(terms[0])
+    store.put(terms[2], MemoStore.NORMAL, terms[2])
+    assert store.statistics()['collected'] == 1
+    assert terms[2]._memo[MemoStore.NORMAL] is terms[2]
@@ -0,0 +1,22 @@
+program = '''
+parameter N : type[0]
+parameter O : N
+parameter S : N -> N
+definition numeral := (T : type[0]) -> (T -> T) -> T -> T
+definition one := (T : type[0]) => (f : T -> T) => (x : T) => f x
+definition plus := (n1 : numeral) => (n2 : numeral) => (T : type[0]) => (f : T -> T) => (x : T) => n1 T f (n2 T f x)
+definition two := plus one one
+definition addTwo := (n : N) => two N S n
+'''
+
+def test_parallel_evaluate_in_a_job(run):
+    run(program)
+    run('parallel evaluate two N S O &')
+    assert str(run('wait')).endswith('\n(S (S O))')
+
+def test_parallel_map_in_a_job(run, tmp_path):
+    run(program)
+    path = tmp_path / 'inputs.txt'
+    path.write_text('O\nS O\n')
+    run('parallel map addTwo over "' + str(path) + '" &')
+    assert str(run('wait')).endswith('\n(S (S O))\n(S (S (S O)))')
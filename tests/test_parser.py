@@ -0,0 +1,28 @@
+import ttParser
+
+def test_in_as_a_name(run):
+    run('''
+parameter N : type[0]
+parameter in : N
+definition same := (n : N) => n
+definition d := let x := (same in) in same x
+''')
+    assert str(run('check in')) == 'N'
+    assert str(run('check d')) == 'N'
+
+def test_let_as_a_name(run):
+    run('''
+parameter N : type[0]
+parameter let : N -> N
+parameter zero : N
+definition d := let (x : N) := let zero in let x
+''')
+    assert str(run('check d')) == 'N'
+
+def test_nested_lets(run):
+    run('''
+parameter N : type[0]
+parameter zero : N
+definition d := let x := (let y := zero in y) in let z : N := x in z
+''')
+    assert str(run('check d')) == 'N'
@@ -0,0 +1,35 @@
+import os
+
+import pytest
+
+import ttCore
+import ttErrors
+import ttParser
+
+def test_publish_and_attach(run, tmp_path):
+    path = str(tmp_path / 'library.ttlib')
+    run('''
+parameter N : type[0]
+parameter O : N
+definition same := (n : N) => n
+''')
+    assert run('publish "' + path + '"') == 'Published 3 declarations'
+    assert os.listdir(str(tmp_path)) == ['library.ttlib']
+    attached = ttCore.Session()
+    def check():
+        ttParser.parse('attach "' + path + '"').execute()
+        return str(ttParser.parse('check same O').execute())
+    assert ttCore.runIn(attached, check) == 'N'
+
+def test_failed_publication_keeps_the_previous_library(run, tmp_path):
+    path = str(tmp_path / 'library.ttlib')
+    run('parameter N : type[0]')
+    run('publish "' + path + '"')
+    with open(path, 'rb') as f:
+        published = f.read()
+    run('inductive Bool : type[0] := true : Bool | false : Bool')
+    with pytest.raises(ttErrors.PublicationError):
+        run('publish "' + path + '"')
+    with open(path, 'rb') as f:
+        assert f.read() == published
+    assert os.listdir(str(tmp_path)) == ['library.ttlib']
@@ -0,0 +1,28 @@
+import ttCore
+import ttParser
+
+numerals = '''
+definition numeral := (T : type[0]) -> (T -> T) -> T -> T
+definition one := (T : type[0]) => (f : T -> T) => (x : T) => f x
+definition plus := (n1 : numeral) => (n2 : numeral) => (T : type[0]) => (f : T -> T) => (x : T) => n1 T f (n2 T f x)
+definition two := plus one one
+'''
+
+def normalStatistics(run, source):
+    run(numerals)
+    return ttCore.runIn(run.session, lambda: ttCore.TermStatistics(ttParser.parse('stats ' + source).term.normalize()))
+
+def test_normal_form_counted_as_printed(run):
+    # (n2 : (T : type[0]) -> (T -> T) -> T -> T) => (T : type[0]) => (f : T -> T) => (x : T) => f (f (n2 T f x))
+    s = normalStatistics(run, 'plus two')
+    assert (s.dagSize, s.treeSize) == (29, 29)
+    assert (s.depth, s.binderDepth) == (10, 4)
+    assert s.classes == {'TLambda': 4, 'TProduct': 5, 'TUniverse': 2, 'TApplication': 5, 'TBoundVariable': 13}
+    assert s.globals == set()
+    assert s.typeSize > 0
+
+def test_globals_of_a_term(run):
+    run(numerals)
+    s = ttCore.runIn(run.session, lambda: ttCore.TermStatistics(ttParser.parse('stats plus two').term))
+    assert (s.dagSize, s.treeSize, s.binderDepth, s.typeSize) == (3, 3, 0, 0)
+    assert sorted(var.name for var in s.globals) == ['plus', 'two']